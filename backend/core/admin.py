@@ -0,0 +1,28 @@
+from core.models import Job
+from django.contrib import admin
+from django.utils import timezone
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Админ модель Job."""
+
+    list_display = (
+        "name",
+        "status",
+        "attempts",
+        "run_at",
+        "created",
+    )
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_at", "last_error", "created")
+    actions = ("retry",)
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Job.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_at=None,
+        )
@@ -0,0 +1,118 @@
+"""Общие части асинхронных представлений только для чтения."""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from core.mixins import conditional_response
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django_filters.utils import translate_validation
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Потоки для запросов к базе. У каждого потока своё соединение, которое
+# переживает запрос по правилам CONN_MAX_AGE.
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS,
+    thread_name_prefix="async-db",
+)
+
+
+def run_sync(func, *args, **kwargs):
+    """Выполняет func в пуле потоков базы и возвращает awaitable."""
+
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False, executor=executor)()
+
+
+def _authenticate(request) -> Request:
+    request = Request(
+        request,
+        authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    request.user
+    return request
+
+
+def json_response(data, status=200) -> JsonResponse:
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def error_response(error: APIException) -> JsonResponse:
+    return json_response({"detail": error.detail}, status=error.status_code)
+
+
+def async_api_view(func):
+    """Асинхронное представление из корутины func(request)."""
+
+    @wraps(func)
+    async def view(request, *args, **kwargs):
+        try:
+            request = await run_sync(_authenticate, request)
+            data = await func(request, *args, **kwargs)
+        except APIException as error:
+            return error_response(error)
+        return json_response(data)
+
+    return view
+
+
+def conditional_api_view(version_name, max_age):
+    """Асинхронное представление справочника с условным GET."""
+
+    def decorator(func):
+        def call(request, *args, **kwargs):
+            return conditional_response(
+                request,
+                version_name,
+                max_age,
+                lambda: json_response(func(request, *args, **kwargs)),
+            )
+
+        @wraps(func)
+        async def view(request, *args, **kwargs):
+            try:
+                return await run_sync(call, request, *args, **kwargs)
+            except APIException as error:
+                return error_response(error)
+
+        return view
+
+    return decorator
+
+
+def filter_queryset(filterset_class, queryset, request):
+    """queryset с фильтрами из запроса, как у DjangoFilterBackend."""
+    filterset = filterset_class(
+        request.query_params,
+        queryset=queryset,
+        request=request,
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+def paginate(pagination_class, queryset, request, serialize) -> dict:
+    """Страница queryset в конверте pagination_class."""
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(serialize(list(page))).data
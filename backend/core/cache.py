@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(name: str) -> str:
+    return f"version:{name}"
+
+
+def _modified_key(name: str) -> str:
+    return f"modified:{name}"
+
+
+def get_version(name: str) -> int:
+    """Возвращает текущую версию пространства ключей name."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия берётся из времени, чтобы после вытеснения
+        # ключа из кэша не вернуться к уже использованному номеру.
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            return cache.get(key, version)
+    return version
+
+
+def get_modified(name: str) -> int:
+    """Возвращает время последней смены версии name (unix time)."""
+    key = _modified_key(name)
+    modified = cache.get(key)
+    if modified is None:
+        modified = int(time.time())
+        if not cache.add(key, modified, None):
+            return cache.get(key, modified)
+    return modified
+
+
+def bump_version(name: str) -> int:
+    """Инвалидирует все ключи, построенные на версии name."""
+    cache.set(_modified_key(name), int(time.time()), None)
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(name: str):
+    """bump_version после коммита текущей транзакции."""
+    transaction.on_commit(lambda: bump_version(name))
@@ -0,0 +1,8 @@
+from django.db.models import F
+
+
+def change_counter(queryset, field: str, delta: int) -> int:
+    """Атомарно меняет счётчик field на delta, не ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
@@ -1,22 +1,110 @@
-import base64
-import uuid
-
-from django.core.files.base import ContentFile
-from rest_framework.serializers import Field, ValidationError
-
-
-def generate_uuid(max_length=12) -> str:
-    """Генерирует 12 символов UUID."""
-    return uuid.uuid4().hex[:max_length]
+from core.images import (
+    VARIANTS,
+    ImageError,
+    decode_base64,
+    hash_file,
+    open_image,
+)
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+from rest_framework.serializers import (
+    Field,
+    PrimaryKeyRelatedField,
+    ValidationError,
+)
 
 
 class Base64Field(Field):
+    """Изображение в виде data URL."""
+
     def to_internal_value(self, value: str):
-        data = value.split(",")
-        if not data[0].startswith("data:image/") and not data[0].endswith(
-            "base64",
+        if not isinstance(value, str):
+            raise ValidationError("Не корректная строка")
+        header, _, data = value.partition(",")
+        if not header.startswith("data:image/") or not header.endswith(
+            ";base64",
         ):
             raise ValidationError("Не корректная строка")
-        image_data = base64.b64decode(data[1])
-        name = generate_uuid()
-        return ContentFile(image_data, name=f"{name}.png")
+        try:
+            file, digest = decode_base64(data, settings.IMAGE_MAX_SIZE)
+            return open_image(file, digest)
+        except ImageError as error:
+            raise ValidationError(str(error))
+
+
+class ImageUploadField(Base64Field):
+    """Изображение файлом из multipart/form-data или строкой base64."""
+
+    def to_internal_value(self, value):
+        if not isinstance(value, UploadedFile):
+            return super().to_internal_value(value)
+        try:
+            digest = hash_file(value, settings.IMAGE_MAX_SIZE)
+            return open_image(value, digest)
+        except ImageError as error:
+            raise ValidationError(str(error))
+
+
+class ImageVariantsField(Field):
+    """Ссылки на уменьшенные копии фото; пока копий нет — на оригинал."""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        if not obj.image:
+            return None
+        variants = obj.image_variants or {}
+        if variants.get("source") != obj.image.name:
+            variants = {}
+        request = self.context.get("request")
+        urls = {}
+        for variant in VARIANTS:
+            url = obj.image.storage.url(variants.get(variant, obj.image.name))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant] = url
+        return urls
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список id, который разрешается одним запросом id__in."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        ids = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                ids.append(int(item))
+            except (TypeError, ValueError):
+                self.child_relation.fail(
+                    "incorrect_type",
+                    data_type=type(item).__name__,
+                )
+        found = self.child_relation.get_queryset().in_bulk(ids)
+        missing = [str(pk) for pk in ids if pk not in found]
+        if missing:
+            raise ValidationError(
+                f"Объекты с id {', '.join(missing)} не существуют.",
+            )
+        return [found[pk] for pk in ids]
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, который с many=True не делает запрос на id."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
@@ -0,0 +1,139 @@
+"""Приём изображений и подготовка уменьшенных копий."""
+import base64
+import binascii
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+FORMATS = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "WEBP": "webp",
+    "GIF": "gif",
+}
+# Размер куска base64; кратен 4, чтобы каждый кусок декодировался отдельно.
+CHUNK_SIZE = 256 * 1024
+# До этого размера декодированный файл держится в памяти, дальше — на диске.
+SPOOL_SIZE = 1024 * 1024
+# Уменьшенные копии: имя -> (сторона описанного квадрата, формат).
+VARIANTS = {
+    "card": (600, "JPEG"),
+    "card_webp": (600, "WEBP"),
+    "detail": (1200, "JPEG"),
+    "detail_webp": (1200, "WEBP"),
+}
+
+
+# Pillow отказывается открывать файлы больше удвоенного предела, а всё,
+# что больше самого предела, отклоняет open_image.
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+
+class ImageError(ValueError):
+    pass
+
+
+def decode_base64(data: str, max_size: int):
+    """Декодирует base64 во временный файл; возвращает файл и sha256."""
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = base64.b64decode(
+                data[start:start + CHUNK_SIZE],
+                validate=True,
+            )
+            size += len(chunk)
+            if size > max_size:
+                raise ImageError(
+                    f"Размер изображения больше {max_size} байт.",
+                )
+            digest.update(chunk)
+            buffer.write(chunk)
+    except binascii.Error:
+        buffer.close()
+        raise ImageError("Некорректная строка base64.")
+    except ImageError:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer, digest.hexdigest()
+
+
+def hash_file(file, max_size: int) -> str:
+    """Считает sha256 загруженного файла, читая его по кускам."""
+    if file.size > max_size:
+        raise ImageError(f"Размер изображения больше {max_size} байт.")
+    digest = hashlib.sha256()
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def open_image(file, digest: str) -> File:
+    """Проверяет, что file — изображение, и называет его по хешу."""
+    too_large = ImageError(
+        f"Изображение больше {settings.IMAGE_MAX_PIXELS} пикселей.",
+    )
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+            if width * height > settings.IMAGE_MAX_PIXELS:
+                raise too_large
+            image.verify()
+    except Image.DecompressionBombError:
+        raise too_large
+    except ImageError:
+        raise
+    except (OSError, SyntaxError, ValueError):
+        raise ImageError("Файл не является изображением.")
+    if image_format not in FORMATS:
+        raise ImageError(f"Формат {image_format} не поддерживается.")
+    file.seek(0)
+    name = f"{digest}.{FORMATS[image_format]}"
+    if isinstance(file, File):
+        # Загруженный файл отдаётся как есть: хранилище перенесёт его
+        # временный файл на место, а не скопирует.
+        file.name = name
+        return file
+    return File(file, name=name)
+
+
+def _render(image, size: int, image_format: str) -> ContentFile:
+    image = image.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    if image_format == "JPEG" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, "white")
+        image = image.convert("RGBA")
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=82)
+    return ContentFile(buffer.getvalue())
+
+
+def make_variants(storage, name: str) -> dict:
+    """Создаёт уменьшенные копии name рядом с оригиналом."""
+    root, _ = os.path.splitext(name)
+    variants = {"source": name}
+    with storage.open(name) as source, Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        for variant, (size, image_format) in VARIANTS.items():
+            variant_name = f"{root}_{variant}.{FORMATS[image_format]}"
+            if not storage.exists(variant_name):
+                storage.save(
+                    variant_name,
+                    _render(image, size, image_format),
+                )
+            variants[variant] = variant_name
+    return variants
@@ -0,0 +1,105 @@
+"""Очередь отложенных задач в таблице core.Job."""
+import traceback
+from datetime import timedelta
+
+from core.models import Job
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+# Потолок паузы между повторами, в секундах.
+MAX_RETRY_DELAY = 3600
+
+_handlers = {}
+
+
+def job(name: str):
+    """Регистрирует обработчик задачи name."""
+
+    def register(func):
+        _handlers[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name: str, delay: int = 0, **payload):
+    """Ставит задачу name с аргументами payload в очередь."""
+    enqueue_many(name, [payload], delay)
+
+
+def enqueue_many(name: str, payloads, delay: int = 0):
+    """Ставит в очередь задачи name одним INSERT."""
+    if name not in _handlers:
+        raise LookupError(f"Неизвестная задача {name}.")
+    payloads = list(payloads)
+    if not payloads:
+        return
+    if settings.JOBS_RUN_INLINE:
+        handler = _handlers[name]
+        transaction.on_commit(
+            lambda: [handler(**payload) for payload in payloads],
+        )
+        return
+    run_at = timezone.now() + timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        Job(name=name, payload=payload, run_at=run_at)
+        for payload in payloads
+    )
+
+
+def claim(limit: int) -> list:
+    """Забирает до limit готовых задач и помечает их выполняемыми."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.PENDING, run_at__lte=now)
+                | Q(status=Job.RUNNING, locked_at__lt=stale),
+            )
+            .order_by("run_at")[:limit],
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def run(job: Job) -> bool:
+    """Выполняет задачу; успешная удаляется, неудачная откладывается."""
+    current = Job.objects.filter(pk=job.pk, locked_at=job.locked_at)
+    try:
+        handler = _handlers.get(job.name)
+        if handler is None:
+            raise LookupError(f"Неизвестная задача {job.name}.")
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception:
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            current.update(
+                status=Job.FAILED,
+                last_error=traceback.format_exc(),
+            )
+        else:
+            delay = min(
+                settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1),
+                MAX_RETRY_DELAY,
+            )
+            current.update(
+                status=Job.PENDING,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                last_error=traceback.format_exc(),
+            )
+        return False
+    current.delete()
+    return True
@@ -0,0 +1,34 @@
+from itertools import islice
+
+from core.jobs import enqueue_many
+from django.core.management.base import BaseCommand
+from recipes.feed import BACKFILL_TIMELINE
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        "Ставит в очередь заполнение лент по всем подпискам. Нужна один "
+        "раз после появления лент; дальше они пополняются сами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.values_list("user_id", "following_id")
+        follows = follows.order_by("pk").iterator()
+        total = 0
+        while True:
+            chunk = list(islice(follows, options["chunk_size"]))
+            if not chunk:
+                break
+            enqueue_many(
+                BACKFILL_TIMELINE,
+                [
+                    {"user_id": user_id, "author_id": author_id}
+                    for user_id, author_id in chunk
+                ],
+            )
+            total += len(chunk)
+        self.stdout.write(f"Поставлено задач: {total}")
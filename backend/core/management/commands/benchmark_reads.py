@@ -0,0 +1,94 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+PATHS = (
+    "recipes/",
+    "recipes/?page=2",
+    "tags/",
+    "ingredients/?name=а",
+    "users/subscriptions/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает запущенные серверы: синхронный API под WSGI "
+        "(gunicorn) и асинхронный под ASGI (uvicorn). Оба получают "
+        "одинаковое число HTTP-запросов с одинаковой параллельностью, "
+        "итог в запросах в секунду и перцентилях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument(
+            "--wsgi-url",
+            default="http://localhost/api/",
+            help="Адрес синхронного API.",
+        )
+        parser.add_argument(
+            "--asgi-url",
+            default="http://localhost/api/async/",
+            help="Адрес асинхронного API.",
+        )
+        parser.add_argument(
+            "--token",
+            help="Токен пользователя для эндпоинтов с авторизацией.",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Путь относительно API; можно указать несколько раз.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError(
+                "Нужны положительные --requests и --concurrency.",
+            )
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        for path in options["paths"] or PATHS:
+            for name in ("wsgi", "asgi"):
+                url = options[f"{name}_url"].rstrip("/") + "/" + path
+                started = time.perf_counter()
+                timings = self.run(
+                    url,
+                    headers,
+                    options["requests"],
+                    options["concurrency"],
+                )
+                elapsed = time.perf_counter() - started
+                self.report(name, path, timings, elapsed)
+
+    def run(self, url, headers, total, concurrency) -> list:
+        def call(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(url, headers=headers)) as response:
+                    response.read()
+            except HTTPError as error:
+                raise CommandError(f"{url}: ответ {error.code}.")
+            except URLError as error:
+                raise CommandError(f"{url}: {error.reason}.")
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(call, range(total)))
+
+    def report(self, name, path, timings, elapsed):
+        timings = sorted(timings)
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        self.stdout.write(
+            f"{name} {path}: {len(timings) / elapsed:.1f} запр./с, "
+            f"p50 {statistics.median(timings) * 1000:.1f} мс, "
+            f"p95 {p95 * 1000:.1f} мс",
+        )
@@ -0,0 +1,85 @@
+import json
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает рецепты в JSONL: одна строка — рецепт с тегами, "
+        "ингредиентами и именем файла фото."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        output = (
+            sys.stdout
+            if options["path"] == "-"
+            else open(options["path"], "w", encoding="UTF-8")
+        )
+        recipes = Recipe.objects.order_by("id").values(
+            "id",
+            "author__email",
+            "name",
+            "text",
+            "image",
+            "image_variants",
+            "cooking_time",
+        ).iterator(chunk_size=options["chunk_size"])
+        total = 0
+        try:
+            while True:
+                chunk = list(islice(recipes, options["chunk_size"]))
+                if not chunk:
+                    break
+                for recipe in self.with_related(chunk):
+                    output.write(json.dumps(recipe, ensure_ascii=False))
+                    output.write("\n")
+                total += len(chunk)
+                if options["verbosity"] > 1:
+                    self.stderr.write(f"Выгружено рецептов: {total}")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f"Выгружено рецептов: {total}")
+
+    def with_related(self, chunk):
+        """Дополняет пачку рецептов тегами и ингредиентами (2 запроса)."""
+        ids = [recipe["id"] for recipe in chunk]
+        tags = {recipe_id: [] for recipe_id in ids}
+        for recipe_id, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=ids,
+        ).values_list("recipe_id", "tag__slug"):
+            tags[recipe_id].append(slug)
+        ingredients = {recipe_id: [] for recipe_id in ids}
+        for row in RecipeIngredient.objects.filter(
+            recipe_id__in=ids,
+        ).order_by("id").values(
+            "recipe_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        ):
+            ingredients[row["recipe_id"]].append(
+                {
+                    "name": row["ingredient__name"],
+                    "measurement_unit": row["ingredient__measurement_unit"],
+                    "amount": str(row["amount"]),
+                },
+            )
+        for recipe in chunk:
+            yield {
+                "author": recipe["author__email"],
+                "name": recipe["name"],
+                "text": recipe["text"],
+                "image": recipe["image"],
+                "image_variants": recipe["image_variants"],
+                "cooking_time": recipe["cooking_time"],
+                "tags": tags[recipe["id"]],
+                "ingredients": ingredients[recipe["id"]],
+            }
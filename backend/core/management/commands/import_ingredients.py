@@ -1,37 +1,155 @@
 import csv
-import logging
+import json
 import os
+import re
+import time
+from itertools import islice
 
+from core.cache import bump_version
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.api.cache import CATALOG_VERSION
+from recipes.api.ingredient_index import INGREDIENTS_VERSION
 from recipes.models import Ingredient
 
 
-logger = logging.getLogger(__name__)
+READ_SIZE = 64 * 1024
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+def read_csv(file):
+    for line in csv.reader(file):
+        if len(line) < 2:
+            continue
+        yield line[0], line[1]
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по одному."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив.")
+    # Номер строки, с которой начинается buffer.
+    line = 1
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError("Некорректный JSON.")
+            line += buffer.count("\n", 0, position)
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        fields = (
+            [item.get("name"), item.get("measurement_unit")]
+            if isinstance(item, dict)
+            else [None]
+        )
+        if not all(isinstance(value, str) for value in fields):
+            raise CommandError(
+                "Строка {}: ожидался объект со строками name и "
+                "measurement_unit.".format(
+                    line + buffer.count("\n", 0, position),
+                ),
+            )
+        position = end
+        yield fields
+
+
+READERS = {".csv": read_csv, ".json": read_json}
 
 
 class Command(BaseCommand):
+    help = (
+        "Загружает ингредиенты из CSV (название,единицы) или JSON "
+        "([{name, measurement_unit}]). Уже существующие пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=os.path.join(settings.BASE_DIR, "ingredients.csv"),
+        )
+        parser.add_argument("--format", choices=("csv", "json"))
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, какие ингредиенты будут добавлены.",
+        )
+
     def handle(self, *args, **options):
-        logger.info("Importing data from: %s", settings.BASE_DIR)
-
-        with open(
-            os.path.join(settings.BASE_DIR, "ingredients.csv"),
-            "r",
-            encoding="UTF-8",
-        ) as ingredients:
-            ingredients_file = csv.reader(ingredients)
-            for counter, line in enumerate(ingredients_file):
-                name = line[0]
-                measurement_unit = line[1]
-                obj, created = Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=measurement_unit,
-                )
-
-                if not created:
-                    print(name)
-                    obj.name = name
-                    obj.measurement_unit = measurement_unit
-                    obj.save()
-                logger.info("%s, %s", counter, created)
-        logger.info("Importing data: Finish")
+        path = options["path"]
+        extension = (
+            f".{options['format']}"
+            if options["format"]
+            else os.path.splitext(path)[1].lower()
+        )
+        if extension not in READERS:
+            raise CommandError("Укажите --format csv или json.")
+        started = time.monotonic()
+        existing = set(
+            Ingredient.objects.values_list("name", "measurement_unit"),
+        )
+        stats = {"read": 0, "repeated": 0, "existing": 0, "added": 0}
+        with open(path, encoding="UTF-8") as file:
+            rows = self.new_rows(READERS[extension](file), existing, stats)
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+                if options["dry_run"]:
+                    for name, measurement_unit in chunk:
+                        self.stdout.write(f"+ {name}, {measurement_unit}")
+                else:
+                    with transaction.atomic():
+                        Ingredient.objects.bulk_create(
+                            [
+                                Ingredient(
+                                    name=name,
+                                    measurement_unit=measurement_unit,
+                                )
+                                for name, measurement_unit in chunk
+                            ],
+                            ignore_conflicts=True,
+                        )
+                stats["added"] += len(chunk)
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"Прочитано строк: {stats['read']}")
+        if stats["added"] and not options["dry_run"]:
+            # bulk_create не отправляет сигналы, кэши сбрасываются здесь.
+            bump_version(INGREDIENTS_VERSION)
+            bump_version(CATALOG_VERSION)
+        self.stdout.write(
+            "{} строк, повторов в файле {}, уже в базе {}, {} {} "
+            "за {:.1f} с.".format(
+                stats["read"],
+                stats["repeated"],
+                stats["existing"],
+                "будет добавлено" if options["dry_run"] else "добавлено",
+                stats["added"],
+                time.monotonic() - started,
+            ),
+        )
+
+    def new_rows(self, rows, existing, stats):
+        seen = set()
+        for name, measurement_unit in rows:
+            stats["read"] += 1
+            key = (name.strip(), measurement_unit.strip())
+            if key in seen:
+                stats["repeated"] += 1
+            elif key in existing:
+                stats["existing"] += 1
+            else:
+                seen.add(key)
+                yield key
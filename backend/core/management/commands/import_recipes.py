@@ -0,0 +1,247 @@
+import json
+import os
+from collections import Counter, defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from core.cache import bump_version_on_commit
+from core.counters import change_counter
+from core.jobs import enqueue_many
+from core.models import ImportProgress
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.api import cache as recipe_cache
+from recipes.api.ingredient_index import INGREDIENTS_VERSION
+from recipes.api.pagination import RECIPE_COUNT_VERSION
+from recipes.feed import FAN_OUT_RECIPE
+from recipes.images import RENDER_IMAGE_VARIANTS
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import update_search_vector
+
+
+User = get_user_model()
+
+RECIPE_FIELDS = (
+    "author",
+    "name",
+    "text",
+    "image",
+    "cooking_time",
+    "tags",
+    "ingredients",
+)
+INGREDIENT_FIELDS = ("name", "measurement_unit", "amount")
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает рецепты из JSONL, выгруженного export_recipes. "
+        "Каждая пачка пишется в своей транзакции вместе с номером "
+        "следующей строки; после сбоя загрузку можно продолжить с "
+        "--resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--start-line",
+            type=int,
+            default=1,
+            help="С какой строки файла начинать.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить с места, на котором остановилась загрузка.",
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        start = options["start_line"]
+        if options["resume"]:
+            start = (
+                ImportProgress.objects.filter(path=path)
+                .values_list("line", flat=True)
+                .first()
+                or start
+            )
+        total = 0
+        with open(path, encoding="UTF-8") as file:
+            lines = islice(file, start - 1, None)
+            line_number = start
+            while True:
+                chunk = list(islice(lines, options["chunk_size"]))
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    total += self.import_chunk(line_number, chunk)
+                    line_number += len(chunk)
+                    # Прогресс коммитится вместе с пачкой: после сбоя
+                    # --resume не загрузит её повторно.
+                    ImportProgress.objects.update_or_create(
+                        path=path,
+                        defaults={"line": line_number},
+                    )
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"Загружено строк до {line_number}")
+        ImportProgress.objects.filter(path=path).delete()
+        self.stdout.write(f"Загружено рецептов: {total}")
+
+    def parse(self, line_number, line) -> dict:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise CommandError(f"Строка {line_number}: некорректный JSON.")
+        if not isinstance(item, dict):
+            raise CommandError(f"Строка {line_number}: ожидался объект.")
+        missing = [field for field in RECIPE_FIELDS if field not in item]
+        if not missing:
+            missing = [
+                f"ingredients.{field}"
+                for ingredient in item["ingredients"]
+                for field in INGREDIENT_FIELDS
+                if not isinstance(ingredient, dict) or field not in ingredient
+            ]
+        if missing:
+            raise CommandError(
+                "Строка {}: нет полей {}.".format(
+                    line_number,
+                    ", ".join(dict.fromkeys(missing)),
+                ),
+            )
+        return item
+
+    def import_chunk(self, line_number, lines) -> int:
+        items = [
+            self.parse(line_number + offset, line)
+            for offset, line in enumerate(lines)
+            if line.strip()
+        ]
+        authors = self.get_objects(
+            User,
+            "email",
+            {item["author"] for item in items},
+        )
+        tags = self.get_objects(
+            Tag,
+            "slug",
+            {slug for item in items for slug in item["tags"]},
+        )
+        ingredients = self.get_ingredients(
+            {
+                (ingredient["name"], ingredient["measurement_unit"])
+                for item in items
+                for ingredient in item["ingredients"]
+            },
+        )
+        recipes = [
+            Recipe(
+                author=authors[item["author"]],
+                name=item["name"],
+                text=item["text"],
+                image=item["image"],
+                image_variants=item.get("image_variants") or {},
+                cooking_time=item["cooking_time"],
+            )
+            for item in items
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            self.after_bulk_create(recipes)
+        else:
+            # Без RETURNING bulk_create не вернёт id; save() заодно
+            # отправит сигналы, которые обновят счётчики и кэши.
+            for recipe in recipes:
+                recipe.save()
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe=recipe, tag=tags[slug])
+                for recipe, item in zip(recipes, items)
+                for slug in set(item["tags"])
+            ],
+        )
+        rows = []
+        for recipe, item in zip(recipes, items):
+            amounts = Counter()
+            for ingredient in item["ingredients"]:
+                key = (ingredient["name"], ingredient["measurement_unit"])
+                amounts[ingredients[key]] += Decimal(ingredient["amount"])
+            rows.extend(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=amount,
+                )
+                for ingredient, amount in amounts.items()
+            )
+        RecipeIngredient.objects.bulk_create(rows)
+        # Связи и ингредиенты записаны в обход сигналов.
+        recipe_cache.invalidate_all()
+        bump_version_on_commit(RECIPE_COUNT_VERSION)
+        return len(recipes)
+
+    def after_bulk_create(self, recipes):
+        """Делает то, что при save() сделали бы сигналы Recipe."""
+        authors = Counter(recipe.author_id for recipe in recipes)
+        by_delta = defaultdict(list)
+        for author_id, delta in authors.items():
+            by_delta[delta].append(author_id)
+        for delta, author_ids in by_delta.items():
+            change_counter(
+                User.objects.filter(pk__in=author_ids),
+                "recipes_count",
+                delta,
+            )
+        update_search_vector([recipe.pk for recipe in recipes])
+        enqueue_many(
+            FAN_OUT_RECIPE,
+            [{"recipe_id": recipe.pk} for recipe in recipes],
+        )
+        enqueue_many(
+            RENDER_IMAGE_VARIANTS,
+            [
+                {"recipe_id": recipe.pk}
+                for recipe in recipes
+                if recipe.image
+                and recipe.image_variants.get("source") != recipe.image.name
+            ],
+        )
+
+    def get_objects(self, model, field, values) -> dict:
+        found = model.objects.in_bulk(list(values), field_name=field)
+        missing = sorted(values - set(found))
+        if missing:
+            raise CommandError(
+                f"{model._meta.verbose_name_plural} не найдены: "
+                f"{', '.join(missing)}.",
+            )
+        return found
+
+    def get_ingredients(self, keys) -> dict:
+        """Находит ингредиенты по (name, measurement_unit), создаёт новые."""
+
+        def fetch():
+            return {
+                (ingredient.name, ingredient.measurement_unit): ingredient
+                for ingredient in Ingredient.objects.filter(
+                    name__in={name for name, _ in keys},
+                )
+                if (ingredient.name, ingredient.measurement_unit) in keys
+            }
+
+        found = fetch()
+        missing = keys - set(found)
+        if missing:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in missing
+                ],
+                ignore_conflicts=True,
+            )
+            bump_version_on_commit(INGREDIENTS_VERSION)
+            bump_version_on_commit(recipe_cache.CATALOG_VERSION)
+            return fetch()
+        return found
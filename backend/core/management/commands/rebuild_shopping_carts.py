@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.api.services import invalidate_carts
+from recipes.cart import rebuild_cart_totals
+
+
+class Command(BaseCommand):
+    help = "Пересобирает итоги списков покупок по корзинам и рецептам."
+
+    def handle(self, *args, **options):
+        stale = rebuild_cart_totals()
+        invalidate_carts(stale)
+        self.stdout.write(f"Исправлено корзин: {len(stale)}")
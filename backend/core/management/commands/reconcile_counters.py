@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики и сводит шарды."
+
+    def handle(self, *args, **options):
+        for field, fixed in reconcile_counters().items():
+            self.stdout.write(f"{field}: исправлено строк {fixed}")
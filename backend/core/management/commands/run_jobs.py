@@ -0,0 +1,44 @@
+import time
+
+from core import jobs
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер очереди задач core.Job. Можно запускать несколько "
+        "экземпляров: задачи разбираются через SKIP LOCKED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда очередь пуста.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Разобрать готовые задачи и выйти.",
+        )
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        try:
+            while True:
+                batch = jobs.claim(options["batch_size"])
+                for job in batch:
+                    if jobs.run(job):
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f"Задача {job} не выполнена.")
+                if not batch:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Выполнено задач: {done}, с ошибкой: {failed}")
@@ -0,0 +1,59 @@
+import hashlib
+
+from core.cache import get_modified, get_version
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+from django.utils.http import http_date
+from rest_framework import status
+
+
+def get_etag(request, version_name: str) -> str:
+    accept = request.META.get("HTTP_ACCEPT", "")
+    digest = hashlib.md5(accept.encode()).hexdigest()[:8]
+    version = get_version(version_name)
+    return quote_etag(f"{version_name}-{version}-{digest}")
+
+
+def conditional_response(request, version_name, max_age, view):
+    """Ответ view() или 304 по версии version_name."""
+    etag = get_etag(request, version_name)
+    last_modified = get_modified(version_name)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if response is None:
+        response = view()
+    if response.status_code in (
+        status.HTTP_200_OK,
+        status.HTTP_304_NOT_MODIFIED,
+    ):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+class VersionedConditionalMixin:
+    """Условный GET для справочников по версии из core.cache."""
+
+    conditional_version = None
+    conditional_max_age = 0
+
+    def conditional(self, view, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            self.conditional_version,
+            self.conditional_max_age,
+            lambda: view(request, *args, **kwargs),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+
+
+class PreserveDenormalizedMixin:
+    """save() существующего объекта не пишет поля с editable=False."""
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if field.editable and not field.primary_key
+            ]
+        super().save(*args, **kwargs)
+
+
+class Job(models.Model):
+    """Отложенная задача для воркера run_jobs (см. core.jobs)."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(verbose_name="Задача", max_length=100)
+    payload = models.JSONField(verbose_name="Аргументы", default=dict)
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток",
+        default=0,
+    )
+    run_at = models.DateTimeField(
+        verbose_name="Запустить после",
+        default=timezone.now,
+    )
+    locked_at = models.DateTimeField(
+        verbose_name="Взята в работу",
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(verbose_name="Последняя ошибка", blank=True)
+    created = models.DateTimeField(
+        verbose_name="Создана",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"],
+                name="job_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+
+class ImportProgress(models.Model):
+    """Место, до которого загружен файл import_recipes."""
+
+    path = models.CharField(verbose_name="Файл", max_length=500, unique=True)
+    line = models.PositiveIntegerField(verbose_name="Следующая строка")
+    updated = models.DateTimeField(verbose_name="Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Прогресс загрузки"
+        verbose_name_plural = "Прогресс загрузки"
+
+    def __str__(self):
+        return f"{self.path}:{self.line}"
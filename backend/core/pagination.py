@@ -1,5 +1,170 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from collections import OrderedDict
+
+from core.cache import get_version
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountingPaginator(Paginator):
+    """Paginator, который берёт count из кэша или из оценки планировщика."""
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        cache_key=None,
+        cache_timeout=None,
+        estimate_threshold=None,
+    ):
+        super().__init__(object_list, per_page)
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+        self.estimate_threshold = estimate_threshold
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        if self.estimate_threshold is not None:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > self.estimate_threshold:
+                self.count_is_exact = False
+                return estimate
+        if self.cache_key is None:
+            return self.object_list.count()
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(self.cache_key, count, self.cache_timeout)
+        return count
 
 
 class LimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class CountingLimitPagination(LimitPagination):
+    """LimitPagination с подсчётом count: exact, cached или estimate."""
+
+    count_strategy = "exact"
+    count_version = None
+    count_cache_timeout = 60
+    count_estimate_threshold = 10000
+    count_uncached_params = ()
+    ignored_params = ("cursor",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        strategy = self.count_strategy
+        if any(
+            self.request.query_params.get(param) not in (None, "", "0")
+            for param in self.count_uncached_params
+        ):
+            strategy = "exact"
+        if strategy == "cached":
+            return CountingPaginator(
+                queryset,
+                page_size,
+                cache_key=self.get_count_cache_key(queryset),
+                cache_timeout=self.count_cache_timeout,
+            )
+        if strategy == "estimate":
+            return CountingPaginator(
+                queryset,
+                page_size,
+                estimate_threshold=self.count_estimate_threshold,
+            )
+        return CountingPaginator(queryset, page_size)
+
+    def get_count_cache_key(self, queryset):
+        ignored = (
+            self.page_query_param,
+            self.page_size_query_param,
+            *self.ignored_params,
+        )
+        params = sorted(
+            (name, sorted(values))
+            for name, values in self.request.query_params.lists()
+            if name not in ignored
+        )
+        digest = hashlib.md5(repr(params).encode()).hexdigest()
+        label = queryset.model._meta.label
+        version = get_version(self.count_version or label)
+        return f"count:{label}:{version}:{digest}"
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.page.paginator.count),
+                    ("count_is_exact", self.page.paginator.count_is_exact),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ],
+            ),
+        )
+
+
+class LimitCursorPagination(CursorPagination):
+    """Keyset-пагинация по -id без COUNT(*) и OFFSET."""
+
+    page_size_query_param = "limit"
+    ordering = "-id"
+
+
+class HybridPagination(BasePagination):
+    """Курсорная пагинация при ?cursor=, иначе страницы."""
+
+    cursor_query_param = "cursor"
+    page_only_params = ("search",)
+    cursor_pagination_class = LimitCursorPagination
+    page_pagination_class = LimitPagination
+
+    paginator = None
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, "display_page_controls", False)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params and not any(
+            request.query_params.get(param)
+            for param in self.page_only_params
+        ):
+            self.paginator = self.cursor_pagination_class()
+        else:
+            self.paginator = self.page_pagination_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
@@ -9,7 +9,7 @@ class IsAuthor(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
+            or obj.author_id == request.user.pk
         )
 
     def has_permission(self, request, view):
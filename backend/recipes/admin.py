@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import Q
+from recipes.counters import with_favorites_total
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -49,6 +51,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         "name",
         "author",
+        "get_count_favorites",
     )
     search_fields = (
         "author__username",
@@ -56,8 +59,29 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     readonly_fields = ("get_count_favorites",)
 
+    def get_queryset(self, request):
+        return with_favorites_total(
+            super().get_queryset(request).select_related("author"),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request,
+                queryset,
+                search_term,
+            )
+        found = Recipe.objects.search(search_term).values("id")
+        return (
+            queryset.filter(
+                Q(id__in=found)
+                | Q(author__username__icontains=search_term),
+            ),
+            False,
+        )
+
     def get_count_favorites(self, obj):
-        return obj.users_favorite.count()
+        return obj.favorites_total
 
     get_count_favorites.short_description = "В избранном у"
 
@@ -0,0 +1,93 @@
+import asyncio
+
+from core.async_views import (
+    async_api_view,
+    conditional_api_view,
+    filter_queryset,
+    paginate,
+    run_sync,
+)
+from django.conf import settings
+from recipes.api import cache as recipe_cache
+from recipes.api.filterset import RecipeFilter
+from recipes.api.ingredient_index import ingredient_index
+from recipes.api.pagination import RecipePagination
+from recipes.api.serializers import IngredientSerializer, TagSerializer
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.exceptions import NotFound
+
+
+catalog_view = conditional_api_view(
+    recipe_cache.CATALOG_VERSION,
+    settings.CATALOG_CACHE_MAX_AGE,
+)
+
+
+async def get_cards(request, ids) -> list:
+    """Карточки рецептов и флаги зрителя читаются одновременно."""
+    cards, viewer = await asyncio.gather(
+        run_sync(recipe_cache.load_cards, ids),
+        run_sync(recipe_cache.load_viewer, request.user, ids),
+    )
+    recipe_cache.finish_cards(request, cards, viewer)
+    return cards
+
+
+def load_page(request) -> dict:
+    return paginate(
+        RecipePagination,
+        filter_queryset(RecipeFilter, Recipe.objects.only("id"), request),
+        request,
+        lambda page: [recipe.id for recipe in page],
+    )
+
+
+@async_api_view
+async def recipe_list(request):
+    cacheable = recipe_cache.is_page_cacheable(request)
+    data = None
+    if cacheable:
+        data = await run_sync(recipe_cache.get_page, request)
+    if data is None:
+        data = await run_sync(load_page, request)
+        if cacheable:
+            await run_sync(recipe_cache.set_page, request, data)
+    data["results"] = await get_cards(request, data["results"])
+    return data
+
+
+@async_api_view
+async def recipe_detail(request, pk):
+    cards = await get_cards(request, [pk])
+    if not cards:
+        raise NotFound
+    return cards[0]
+
+
+@catalog_view
+def tag_list(request):
+    return TagSerializer(Tag.objects.all(), many=True).data
+
+
+@catalog_view
+def tag_detail(request, pk):
+    tag = Tag.objects.filter(pk=pk).first()
+    if tag is None:
+        raise NotFound
+    return TagSerializer(tag).data
+
+
+@catalog_view
+def ingredient_list(request):
+    name = request.GET.get("name")
+    if name:
+        return ingredient_index.search(name)
+    return IngredientSerializer(Ingredient.objects.all(), many=True).data
+
+
+@catalog_view
+def ingredient_detail(request, pk):
+    ingredient = Ingredient.objects.filter(pk=pk).first()
+    if ingredient is None:
+        raise NotFound
+    return IngredientSerializer(ingredient).data
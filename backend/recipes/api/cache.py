@@ -0,0 +1,134 @@
+"""Кэш ответов RecipeViewSet."""
+import hashlib
+
+from core.cache import bump_version, bump_version_on_commit, get_version
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from recipes.api.serializers import GetRecipeSerializer
+from recipes.api.viewer import ViewerState
+from recipes.models import Recipe
+
+
+CARDS_VERSION = "recipe-cards"
+PAGES_VERSION = "recipe-pages"
+CATALOG_VERSION = "catalog"
+USER_FILTERS = ("is_favorited", "is_in_shopping_cart")
+
+
+def is_enabled() -> bool:
+    return settings.RECIPE_CACHE_TIMEOUT > 0
+
+
+def _card_key(version: int, recipe_id: int) -> str:
+    return f"recipe-card:{version}:{recipe_id}"
+
+
+def _page_key(request) -> str:
+    path = f"{request.get_host()}{request.get_full_path()}"
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f"recipe-page:{get_version(PAGES_VERSION)}:{digest}"
+
+
+def is_page_cacheable(request) -> bool:
+    """Выдача с фильтрами по избранному и корзине у каждого своя."""
+    return not (
+        request.user.is_authenticated
+        and any(
+            request.query_params.get(name) not in (None, "", "0")
+            for name in USER_FILTERS
+        )
+    )
+
+
+def get_page(request):
+    return cache.get(_page_key(request))
+
+
+def set_page(request, data):
+    cache.set(_page_key(request), data, settings.RECIPE_CACHE_TIMEOUT)
+
+
+def _render_cards(ids) -> dict:
+    recipes = Recipe.objects.with_related().filter(id__in=ids)
+    data = GetRecipeSerializer(
+        recipes,
+        many=True,
+        context={"request": None},
+    ).data
+    return {card["id"]: card for card in data}
+
+
+def load_viewer(user, ids) -> ViewerState:
+    """Связи зрителя с рецептами ids и их авторами одним запросом."""
+    viewer = ViewerState(user)
+    viewer.load_recipes(ids)
+    return viewer
+
+
+def load_cards(ids) -> list:
+    """Карточки рецептов ids в том же порядке, без флагов зрителя."""
+    version = get_version(CARDS_VERSION)
+    keys = {_card_key(version, recipe_id): recipe_id for recipe_id in ids}
+    cards = {
+        keys[key]: card for key, card in cache.get_many(list(keys)).items()
+    }
+    missing = [recipe_id for recipe_id in ids if recipe_id not in cards]
+    if missing:
+        rendered = _render_cards(missing)
+        cache.set_many(
+            {
+                _card_key(version, recipe_id): card
+                for recipe_id, card in rendered.items()
+            },
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        cards.update(rendered)
+    return [cards[recipe_id] for recipe_id in ids if recipe_id in cards]
+
+
+def finish_cards(request, cards, viewer: ViewerState):
+    """Накладывает флаги зрителя и делает ссылки на файлы абсолютными."""
+    for card in cards:
+        card["is_favorited"] = card["id"] in viewer.favorited
+        card["is_in_shopping_cart"] = card["id"] in viewer.carted
+        card["author"]["is_subscribed"] = (
+            card["author"]["id"] in viewer.followed
+        )
+        card["image"] = request.build_absolute_uri(card["image"])
+        if card["images"]:
+            card["images"] = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in card["images"].items()
+            }
+
+
+def get_cards(request, ids) -> list:
+    """Возвращает карточки рецептов ids в том же порядке."""
+    cards = load_cards(ids)
+    finish_cards(
+        request,
+        cards,
+        load_viewer(request.user, [card["id"] for card in cards]),
+    )
+    return cards
+
+
+def invalidate_recipes(ids, pages=True):
+    """Сбрасывает карточки рецептов ids и выдачу после коммита."""
+    ids = list(ids)
+
+    def invalidate():
+        version = get_version(CARDS_VERSION)
+        cache.delete_many(
+            [_card_key(version, recipe_id) for recipe_id in ids],
+        )
+        if pages:
+            bump_version(PAGES_VERSION)
+
+    transaction.on_commit(invalidate)
+
+
+def invalidate_all():
+    bump_version_on_commit(CARDS_VERSION)
+    bump_version_on_commit(PAGES_VERSION)
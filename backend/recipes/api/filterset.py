@@ -1,7 +1,32 @@
-from django_filters import CharFilter, FilterSet, NumberFilter
+from django import forms
+from django.db.models import Exists, OuterRef
+from django_filters import (
+    CharFilter,
+    ChoiceFilter,
+    Filter,
+    FilterSet,
+    NumberFilter,
+)
 from recipes.models import Ingredient, Recipe
 
 
+TAGS_MATCH_CHOICES = (
+    ("any", "Любой из тегов"),
+    ("all", "Все теги"),
+)
+
+
+class MultipleValueField(forms.MultipleChoiceField):
+    """Список значений без проверки по заранее известным choices."""
+
+    def valid_value(self, value):
+        return True
+
+
+class MultipleCharFilter(Filter):
+    field_class = MultipleValueField
+
+
 class RecipeFilter(FilterSet):
     is_favorited = NumberFilter(
         method="filter_is_favorited",
@@ -12,11 +37,23 @@ class RecipeFilter(FilterSet):
         label="is_in_shopping_cart",
     )
     author = CharFilter(field_name="author")
-    tags = CharFilter(field_name="tags__slug")
+    tags = MultipleCharFilter(method="filter_tags")
+    tags_match = ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES,
+        method="filter_tags_match",
+    )
+    search = CharFilter(method="filter_search")
 
     class Meta:
         model = Recipe
-        fields = ["is_favorited", "is_in_shopping_cart", "author", "tags"]
+        fields = [
+            "is_favorited",
+            "is_in_shopping_cart",
+            "author",
+            "tags",
+            "tags_match",
+            "search",
+        ]
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -38,6 +75,31 @@ class RecipeFilter(FilterSet):
             return queryset.filter(id__in=favorited_recipe)
         return queryset
 
+    def filter_tags(self, queryset, name, value):
+        """Теги через EXISTS: без JOIN по M2M, дублей и DISTINCT."""
+        if not value:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef("pk"),
+        )
+        if self.form.cleaned_data.get("tags_match") == "all":
+            for slug in set(value):
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag__slug=slug)),
+                )
+            return queryset
+        return queryset.filter(
+            Exists(recipe_tags.filter(tag__slug__in=value)),
+        )
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        if value:
+            return queryset.search(value)
+        return queryset
+
 
 class IngredientFilter(FilterSet):
     name = CharFilter(method="filter_name")
@@ -0,0 +1,57 @@
+"""Индекс ингредиентов в памяти процесса для автодополнения."""
+import bisect
+import threading
+
+from core.cache import get_version
+from recipes.models import Ingredient
+
+
+INGREDIENTS_VERSION = "ingredients"
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (версия, отсортированные ключи (название, id), {id: ингредиент})
+        self._state = (None, [], {})
+
+    def _build(self, version):
+        items = {
+            row["id"]: row
+            for row in Ingredient.objects.values(
+                "id",
+                "name",
+                "measurement_unit",
+            )
+        }
+        keys = sorted(
+            (row["name"].casefold(), pk) for pk, row in items.items()
+        )
+        self._state = (version, keys, items)
+
+    def _get_state(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if self._state[0] != version:
+            with self._lock:
+                if self._state[0] != version:
+                    self._build(version)
+        return self._state
+
+    def search(self, query: str) -> list:
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        _, keys, items = self._get_state()
+        query = query.casefold()
+        start = bisect.bisect_left(keys, (query,))
+        end = start
+        while end < len(keys) and keys[end][0].startswith(query):
+            end += 1
+        prefix = [items[pk] for _, pk in keys[start:end]]
+        contains = [
+            items[pk]
+            for name, pk in keys[:start] + keys[end:]
+            if query in name
+        ]
+        return prefix + contains
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+from core.pagination import CountingLimitPagination, HybridPagination
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+RECIPE_COUNT_VERSION = "recipe-count"
+
+
+class RecipeCountPagination(CountingLimitPagination):
+    count_strategy = settings.RECIPE_COUNT_STRATEGY
+    count_version = RECIPE_COUNT_VERSION
+    count_cache_timeout = settings.RECIPE_COUNT_CACHE_TIMEOUT
+    count_estimate_threshold = settings.RECIPE_COUNT_ESTIMATE_THRESHOLD
+    count_uncached_params = ("is_favorited", "is_in_shopping_cart")
+
+
+class RecipePagination(HybridPagination):
+    page_pagination_class = RecipeCountPagination
+
+
+class FeedPagination:
+    """Keyset-пагинация ленты: ?cursor=<id последнего рецепта>&limit=."""
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    max_page_size = 100
+    invalid_cursor_message = "Неверный курсор."
+
+    def get_params(self, request) -> tuple:
+        """(cursor, limit) из запроса; cursor None для первой страницы."""
+        cursor = request.query_params.get(self.cursor_query_param) or None
+        if cursor is not None:
+            try:
+                cursor = int(cursor)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        try:
+            limit = int(
+                request.query_params.get(
+                    self.page_size_query_param,
+                    self.page_size,
+                ),
+            )
+        except ValueError:
+            limit = self.page_size
+        return cursor, min(max(limit, 1), self.max_page_size)
+
+    def get_paginated_response(self, request, results, has_next):
+        next_link = None
+        if has_next and results:
+            next_link = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                results[-1]["id"],
+            )
+        return Response(
+            OrderedDict([("next", next_link), ("results", results)]),
+        )
@@ -0,0 +1,64 @@
+"""Форматы выгрузки списка покупок."""
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Ошибки (401, 404) приходят словарём, а не списком строк.
+            return json.dumps(data, ensure_ascii=False).encode(self.charset)
+        return "".join(self.stream(data)).encode(self.charset)
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, rows):
+        for row in rows:
+            name, unit = row["name"], row["measurement_unit"]
+            yield f"{name}({unit}) - {row['amount']}\n"
+
+
+class _Line:
+    """Файл-заглушка: csv.writer пишет строку, write её возвращает."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, rows):
+        writer = csv.writer(_Line())
+        yield writer.writerow(("name", "measurement_unit", "amount"))
+        for row in rows:
+            yield writer.writerow(
+                (row["name"], row["measurement_unit"], row["amount"]),
+            )
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = "application/json"
+    format = "json"
+
+    def stream(self, rows):
+        yield "["
+        for index, row in enumerate(rows):
+            if index:
+                yield ", "
+            yield json.dumps(
+                {**row, "amount": str(row["amount"])},
+                ensure_ascii=False,
+            )
+        yield "]"
@@ -1,27 +1,29 @@
-from core.fields import Base64Field
-from django.contrib.auth import get_user_model
-from recipes.models import (
-    Favorite,
-    Ingredient,
-    Recipe,
-    RecipeIngredient,
-    ShoppingList,
-    Tag,
+import json
+
+from core.fields import (
+    BulkPrimaryKeyRelatedField,
+    ImageUploadField,
+    ImageVariantsField,
 )
+from django.db import transaction
+from recipes.api.services import set_recipe_ingredients, update_carts
+from recipes.api.viewer import ViewerListSerializer, get_viewer
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 from rest_framework.serializers import (
     CharField,
     DecimalField,
+    IntegerField,
+    ListField,
     ModelSerializer,
     PrimaryKeyRelatedField,
+    Serializer,
     SerializerMethodField,
+    ValidationError,
 )
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.utils import html
 from users.api.serializers import UserSerializer
 
 
-User = get_user_model()
-
-
 class IngredientSerializer(ModelSerializer):
     class Meta:
         model = Ingredient
@@ -73,6 +75,7 @@ class GetRecipeSerializer(ModelSerializer):
     ingredients = SerializerMethodField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -83,32 +86,32 @@ class GetRecipeSerializer(ModelSerializer):
             "ingredients",
             "name",
             "image",
+            "images",
             "text",
             "cooking_time",
             "is_favorited",
             "is_in_shopping_cart",
         )
+        list_serializer_class = ViewerListSerializer
 
     def get_ingredients(self, obj):
         queryset = obj.recipeingredient.all()
         serializer = RecipeIngredientSerializer(queryset, many=True)
         return serializer.data
 
+    def load_viewer(self, viewer, recipes):
+        viewer.load_recipes(recipe.pk for recipe in recipes)
+
     def get_is_favorited(self, obj):
-        user = self.context.get("request").user
-        if user.is_authenticated:
-            return Favorite.objects.filter(user=user, recipe=obj).exists()
-        return False
+        return get_viewer(self.context).is_favorited(obj.pk)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get("request").user
-        if user.is_authenticated:
-            return ShoppingList.objects.filter(user=user, recipe=obj).exists()
-        return False
+        return get_viewer(self.context).is_in_shopping_cart(obj.pk)
 
 
 class RecipeIngredientSerializerInline(ModelSerializer):
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    # Ингредиенты разрешаются пачкой в CreateRecipeSerializer.
+    id = IntegerField(min_value=1)
 
     class Meta:
         fields = ("id", "amount")
@@ -116,74 +119,98 @@ class RecipeIngredientSerializerInline(ModelSerializer):
 
 
 class CreateRecipeSerializer(GetRecipeSerializer):
-    tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     author = UserSerializer(read_only=True)
-    image = Base64Field(write_only=True)
+    image = ImageUploadField(write_only=True)
     ingredients = RecipeIngredientSerializerInline(many=True)
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.parse_form(data)
+        return super().to_internal_value(data)
+
+    def parse_form(self, data) -> dict:
+        """Приводит multipart/form-data к виду JSON-запроса."""
+        form = {
+            key: data[key]
+            for key in data
+            if key not in ("tags", "ingredients")
+        }
+        errors = {}
+        for key in ("tags", "ingredients"):
+            if key not in data:
+                continue
+            values = data.getlist(key)
+            if key == "tags" and not values[0].lstrip().startswith("["):
+                form[key] = values
+                continue
+            try:
+                form[key] = json.loads(values[0])
+            except ValueError:
+                errors[key] = ["Ожидался JSON-список."]
+        if errors:
+            raise ValidationError(errors)
+        return form
+
+    def validate_ingredients(self, value):
+        """Разрешает все ингредиенты одним запросом id__in."""
+        ids = [item["id"] for item in value]
+        found = Ingredient.objects.in_bulk(ids)
+        errors = []
+        missing = sorted({pk for pk in ids if pk not in found})
+        if missing:
+            errors.append(
+                "Ингредиенты с id "
+                f"{', '.join(map(str, missing))} не существуют.",
+            )
+        duplicates = sorted({pk for pk in ids if ids.count(pk) > 1})
+        if duplicates:
+            errors.append(
+                "Ингредиенты с id "
+                f"{', '.join(map(str, duplicates))} указаны несколько раз.",
+            )
+        if errors:
+            raise ValidationError(errors)
+        for item in value:
+            item["id"] = found[item["id"]]
+        return value
+
+    @transaction.atomic
     def create(self, validated_data):
         validated_data["author"] = self.context["request"].user
         ingredients = validated_data.pop("ingredients")
         recipe = super().create(validated_data)
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient["id"],
-                amount=ingredient["amount"],
-            )
+        set_recipe_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        if validated_data.get("ingredients"):
-            ingredients = validated_data.pop("ingredients")
-            instance.ingredients.clear()
-            for ingredient in ingredients:
-                RecipeIngredient.objects.create(
-                    recipe=instance,
-                    ingredient=ingredient["id"],
-                    amount=ingredient["amount"],
-                )
+        ingredients = validated_data.pop("ingredients", None)
+        if ingredients:
+            update_carts(
+                instance.pk,
+                set_recipe_ingredients(instance, ingredients),
+            )
         return super().update(instance, validated_data)
 
 
-class FavoriteSerializer(ModelSerializer):
-    user = PrimaryKeyRelatedField(queryset=User.objects.all())
-    recipe = PrimaryKeyRelatedField(queryset=Recipe.objects.all())
-
-    class Meta:
-        model = Favorite
-        fields = "__all__"
-        validators = [
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=["user", "recipe"],
-                message="Рецепт уже в избранном.",
-            ),
-        ]
-
-
 class RecipeInlineSerializer(ModelSerializer):
+    images = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = (
             "id",
             "name",
             "image",
+            "images",
             "cooking_time",
         )
 
 
-class ShoppingListSerializer(ModelSerializer):
-    user = PrimaryKeyRelatedField(queryset=User.objects.all())
-    recipe = PrimaryKeyRelatedField(queryset=Recipe.objects.all())
-
-    class Meta:
-        model = ShoppingList
-        fields = "__all__"
-        validators = [
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=["user", "recipe"],
-                message="Рецепт уже в списке покупок.",
-            ),
-        ]
+class RecipeIdsSerializer(Serializer):
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
@@ -1,23 +1,241 @@
+from core.cache import bump_version_on_commit, get_version
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F, Sum
-from recipes.models import ShoppingList
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from recipes.api.ingredient_index import INGREDIENTS_VERSION
+from recipes.cart import (
+    carting_users,
+    change_cart_totals,
+    handling_cart_totals,
+    recipe_amounts,
+)
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    ShoppingCartItem,
+    ShoppingList,
+)
 
 
 User = get_user_model()
 
 
-def get_shopping_list(user: User):
-    shop_list = ShoppingList.objects.filter(
-        user=user.id,
-    ).prefetch_related(
-        "recipe",
-    ).values(
-        name=F("recipe__ingredients__name"),
-        unit=F("recipe__recipeingredient__ingredient__measurement_unit"),
-    ).annotate(total_amount=Sum(
-        "recipe__recipeingredient__amount"),
-    ).order_by("recipe__ingredients__name")
-
-    return "\n".join(
-        f'{i["name"]}({i["unit"]}) - {i["total_amount"]}' for i in shop_list
+def cart_version(user_id: int) -> str:
+    return f"shopping-cart:{user_id}"
+
+
+def invalidate_carts(user_ids):
+    """Сбрасывает кэш списков покупок user_ids после коммита."""
+    for user_id in set(user_ids):
+        bump_version_on_commit(cart_version(user_id))
+
+
+def load_shopping_list(user: User) -> list:
+    """Итоги из ShoppingCartItem: чтение по индексу (user, ingredient)."""
+    return [
+        {
+            "id": row["ingredient_id"],
+            "name": row["ingredient__name"],
+            "measurement_unit": row["ingredient__measurement_unit"],
+            "amount": row["amount"],
+        }
+        for row in ShoppingCartItem.objects.filter(user=user).values(
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        ).order_by("ingredient__name", "ingredient__measurement_unit")
+    ]
+
+
+def get_shopping_list(user: User) -> list:
+    """Итоги списка покупок user; повторный вызов берёт их из кэша."""
+    if settings.RECIPE_CACHE_TIMEOUT <= 0:
+        return load_shopping_list(user)
+    key = "shopping-list:{}:{}:{}".format(
+        user.pk,
+        get_version(cart_version(user.pk)),
+        get_version(INGREDIENTS_VERSION),
     )
+    rows = cache.get(key)
+    if rows is None:
+        rows = load_shopping_list(user)
+        cache.set(key, rows, settings.RECIPE_CACHE_TIMEOUT)
+    return rows
+
+
+def set_recipe_ingredients(recipe, ingredients) -> dict:
+    """Приводит ингредиенты рецепта к ingredients, возвращает разницу."""
+    # Вызывается в транзакции: блокировка строк ставит параллельные
+    # правки рецепта в очередь.
+    existing = {
+        row.ingredient_id: row
+        for row in RecipeIngredient.objects.select_for_update().filter(
+            recipe=recipe,
+        )
+    }
+    wanted = {item["id"].pk: item["amount"] for item in ingredients}
+    to_create = []
+    to_update = []
+    deltas = {}
+    for ingredient_id, amount in wanted.items():
+        row = existing.get(ingredient_id)
+        if row is None:
+            to_create.append(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                ),
+            )
+            deltas[ingredient_id] = amount
+        elif row.amount != amount:
+            deltas[ingredient_id] = amount - row.amount
+            row.amount = amount
+            to_update.append(row)
+    to_delete = []
+    for ingredient_id, row in existing.items():
+        if ingredient_id not in wanted:
+            to_delete.append(row.pk)
+            deltas[ingredient_id] = -row.amount
+    with handling_cart_totals([recipe.pk]):
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+    return deltas
+
+
+def update_carts(recipe_id: int, deltas: dict):
+    """Применяет разницу ингредиентов рецепта к итогам его корзин."""
+    if not any(deltas.values()):
+        return
+    users = carting_users(recipe_id)
+    change_cart_totals(users, deltas)
+    invalidate_carts(users)
+
+
+def _change_cart(model, user, recipe_ids, sign: int):
+    """Итоги корзины user после добавления или удаления рецептов."""
+    if model is ShoppingList and recipe_ids:
+        change_cart_totals([user.pk], recipe_amounts(recipe_ids, sign))
+        invalidate_carts([user.pk])
+
+
+RECIPE_LINK_FIELDS = ("id", "name", "image", "image_variants", "cooking_time")
+ADD_RECIPES_SQL = """
+    WITH "added" AS (
+        INSERT INTO {links} ("user_id", "recipe_id")
+        SELECT %s, "id" FROM {recipes} WHERE "id" = ANY(%s)
+        ON CONFLICT DO NOTHING
+        RETURNING "id", "recipe_id"
+    )
+    SELECT {fields}, "added"."id" AS "link_id"
+    FROM {recipes} LEFT JOIN "added" ON "added"."recipe_id" = {recipes}."id"
+    WHERE {recipes}."id" = ANY(%s)
+"""
+REMOVE_RECIPES_SQL = """
+    DELETE FROM {links} WHERE "user_id" = %s AND "recipe_id" = ANY(%s)
+    RETURNING "id", "recipe_id"
+"""
+
+
+def add_recipes(model, user, recipe_ids) -> list:
+    """Добавляет рецепты в избранное или список покупок (model) user."""
+    recipe_ids = list(recipe_ids)
+    db = router.db_for_write(model)
+    connection = connections[db]
+    with transaction.atomic(using=db), handling_cart_totals(recipe_ids):
+        if connection.vendor == "postgresql":
+            quote = connection.ops.quote_name
+            recipes_table = quote(Recipe._meta.db_table)
+            recipes = list(
+                Recipe.objects.raw(
+                    ADD_RECIPES_SQL.format(
+                        links=quote(model._meta.db_table),
+                        recipes=recipes_table,
+                        fields=", ".join(
+                            f"{recipes_table}.{quote(field)}"
+                            for field in RECIPE_LINK_FIELDS
+                        ),
+                    ),
+                    [user.pk, recipe_ids, recipe_ids],
+                ).using(db),
+            )
+            for recipe in recipes:
+                recipe.added = recipe.link_id is not None
+                if recipe.added:
+                    post_save.send(
+                        sender=model,
+                        instance=model(
+                            pk=recipe.link_id,
+                            user=user,
+                            recipe=recipe,
+                        ),
+                        created=True,
+                        update_fields=None,
+                        raw=False,
+                        using=db,
+                    )
+        else:
+            # Без RETURNING по одной строке: get_or_create узнаёт,
+            # вставила ли строку именно эта транзакция, а save() сам
+            # отправит post_save только для неё.
+            recipes = list(
+                Recipe.objects.using(db).filter(pk__in=recipe_ids).only(
+                    *RECIPE_LINK_FIELDS,
+                ),
+            )
+            for recipe in recipes:
+                recipe.added = model.objects.using(db).get_or_create(
+                    user=user,
+                    recipe=recipe,
+                )[1]
+        _change_cart(
+            model,
+            user,
+            [recipe.pk for recipe in recipes if recipe.added],
+            1,
+        )
+    order = {recipe_id: index for index, recipe_id in enumerate(recipe_ids)}
+    recipes.sort(key=lambda recipe: order[recipe.pk])
+    return recipes
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Убирает рецепты из избранного или списка покупок (model) user."""
+    recipe_ids = list(recipe_ids)
+    db = router.db_for_write(model)
+    connection = connections[db]
+    with transaction.atomic(using=db), handling_cart_totals(recipe_ids):
+        if connection.vendor != "postgresql":
+            links = model.objects.using(db).filter(
+                user=user,
+                recipe_id__in=recipe_ids,
+            )
+            removed = list(links.values_list("recipe_id", flat=True))
+            links.delete()
+        else:
+            table = connection.ops.quote_name(model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    REMOVE_RECIPES_SQL.format(links=table),
+                    [user.pk, recipe_ids],
+                )
+                rows = cursor.fetchall()
+            for link_id, recipe_id in rows:
+                post_delete.send(
+                    sender=model,
+                    instance=model(
+                        pk=link_id,
+                        user=user,
+                        recipe_id=recipe_id,
+                    ),
+                    using=db,
+                )
+            removed = [recipe_id for _, recipe_id in rows]
+        _change_cart(model, user, removed, -1)
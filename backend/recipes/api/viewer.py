@@ -0,0 +1,100 @@
+"""Связи текущего пользователя с объектами одного ответа."""
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Exists, Manager, OuterRef
+from recipes.models import Recipe
+from rest_framework.serializers import ListSerializer
+from users.models import Follow
+
+
+class ViewerState:
+    def __init__(self, user):
+        self.user = user
+        self.followed = set()
+        self.favorited = set()
+        self.carted = set()
+        self._authors = set()
+        self._recipes = set()
+
+    def mark_followed(self, author_ids):
+        """Запоминает авторов, подписка на которых уже известна."""
+        author_ids = set(author_ids)
+        self.followed |= author_ids
+        self._authors |= author_ids
+
+    def load_authors(self, author_ids):
+        """Подписки на author_ids одним запросом."""
+        author_ids = set(author_ids) - self._authors
+        if self.user.is_authenticated and author_ids:
+            self.followed.update(
+                Follow.objects.filter(
+                    user_id=self.user.pk,
+                    following_id__in=author_ids,
+                ).values_list("following_id", flat=True),
+            )
+        self._authors |= author_ids
+
+    def load_recipes(self, recipe_ids):
+        """Избранное, корзина и подписки на авторов recipe_ids."""
+        recipe_ids = set(recipe_ids) - self._recipes
+        if self.user.is_authenticated and recipe_ids:
+            rows = (
+                Recipe.objects.filter(id__in=recipe_ids)
+                .with_viewer_flags(self.user)
+                .annotate(
+                    is_subscribed=Exists(
+                        Follow.objects.filter(
+                            user_id=self.user.pk,
+                            following=OuterRef("author"),
+                        ),
+                    ),
+                )
+                .values_list(
+                    "id",
+                    "author_id",
+                    "is_favorited",
+                    "is_in_shopping_cart",
+                    "is_subscribed",
+                )
+            )
+            for recipe_id, author_id, favorited, carted, followed in rows:
+                if favorited:
+                    self.favorited.add(recipe_id)
+                if carted:
+                    self.carted.add(recipe_id)
+                if followed:
+                    self.followed.add(author_id)
+                self._authors.add(author_id)
+        self._recipes |= recipe_ids
+
+    def is_subscribed(self, author_id) -> bool:
+        if not self.user.is_authenticated or author_id == self.user.pk:
+            return False
+        self.load_authors([author_id])
+        return author_id in self.followed
+
+    def is_favorited(self, recipe_id) -> bool:
+        self.load_recipes([recipe_id])
+        return recipe_id in self.favorited
+
+    def is_in_shopping_cart(self, recipe_id) -> bool:
+        self.load_recipes([recipe_id])
+        return recipe_id in self.carted
+
+
+def get_viewer(context) -> ViewerState:
+    """ViewerState из контекста; создаётся при первом обращении."""
+    viewer = context.get("viewer")
+    if viewer is None:
+        request = context.get("request")
+        viewer = ViewerState(request.user if request else AnonymousUser())
+        context["viewer"] = viewer
+    return viewer
+
+
+class ViewerListSerializer(ListSerializer):
+    """Загружает связи зрителя сразу для всех объектов списка."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        self.child.load_viewer(get_viewer(self.context), items)
+        return super().to_representation(items)
@@ -1,19 +1,33 @@
+from core.mixins import VersionedConditionalMixin
 from core.permission import IsAuthor
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
+from recipes.api import cache as recipe_cache
 from recipes.api.filterset import IngredientFilter, RecipeFilter
+from recipes.api.ingredient_index import ingredient_index
+from recipes.api.pagination import FeedPagination, RecipePagination
+from recipes.api.renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer,
+)
 from recipes.api.serializers import (
     CreateRecipeSerializer,
-    FavoriteSerializer,
     GetRecipeSerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeInlineSerializer,
-    ShoppingListSerializer,
     TagSerializer,
 )
-from recipes.api.services import get_shopping_list
+from recipes.api.services import (
+    add_recipes,
+    get_shopping_list,
+    remove_recipes,
+)
+from recipes.feed import get_feed
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
 from rest_framework import status
 from rest_framework.decorators import action
@@ -25,23 +39,40 @@ from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 User = get_user_model()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class CatalogViewSet(VersionedConditionalMixin, ReadOnlyModelViewSet):
+    """Справочник без пагинации с условным GET по версии каталога."""
+
+    authentication_classes = ()
     pagination_class = None
+    conditional_version = recipe_cache.CATALOG_VERSION
+    conditional_max_age = settings.CATALOG_CACHE_MAX_AGE
+
+
+class TagViewSet(CatalogViewSet):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
-    pagination_class = None
+class IngredientViewSet(CatalogViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name:
+            return self.conditional(self.search, request, name)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, name):
+        return Response(ingredient_index.search(name))
+
 
 class RecipeViewSet(ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthor,)
+    pagination_class = RecipePagination
     http_method_names = (
         "get",
         "post",
@@ -54,6 +85,35 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def list(self, request, *args, **kwargs):
+        if not recipe_cache.is_enabled():
+            return super().list(request, *args, **kwargs)
+        data = None
+        if recipe_cache.is_page_cacheable(request):
+            data = recipe_cache.get_page(request)
+        if data is None:
+            queryset = self.filter_queryset(Recipe.objects.only("id"))
+            page = self.paginate_queryset(queryset)
+            data = self.get_paginated_response(
+                [recipe.id for recipe in page],
+            ).data
+            if recipe_cache.is_page_cacheable(request):
+                recipe_cache.set_page(request, data)
+        data["results"] = recipe_cache.get_cards(request, data["results"])
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not recipe_cache.is_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            recipe_id = int(self.kwargs["pk"])
+        except ValueError:
+            raise Http404
+        cards = recipe_cache.get_cards(request, [recipe_id])
+        if not cards:
+            raise Http404
+        return Response(cards[0])
+
     def update(self, request, *args, **kwargs):
         recipe = self.get_object()
         context = {"request": request}
@@ -64,7 +124,7 @@ class RecipeViewSet(ModelViewSet):
             partial=True,
         )
         if serializer.is_valid():
-            obj = serializer.save()
+            obj = self.get_read_object(serializer.save())
             return Response(
                 GetRecipeSerializer(obj, context=context).data,
                 status=status.HTTP_200_OK
@@ -78,18 +138,87 @@ class RecipeViewSet(ModelViewSet):
             context=context,
         )
         if serializer.is_valid():
-            obj = serializer.save()
+            obj = self.get_read_object(serializer.save())
             return Response(
                 GetRecipeSerializer(obj, context=context).data,
                 status=status.HTTP_201_CREATED,
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def get_queryset(self):
+        if self.action in ("list", "retrieve"):
+            return Recipe.objects.with_related()
+        return super().get_queryset()
+
+    def get_read_object(self, recipe):
+        """Перечитывает рецепт тем же запросом, что и list/retrieve."""
+        return Recipe.objects.with_related().get(pk=recipe.pk)
+
     def get_serializer_class(self):
         if self.request.method == "GET":
             return GetRecipeSerializer
         return CreateRecipeSerializer
 
+    def toggle_recipe(self, request, model, pk):
+        """Идемпотентно добавляет рецепт pk в model или убирает из него."""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if request.method == "DELETE":
+            remove_recipes(model, request.user, [recipe_id])
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        recipes = add_recipes(model, request.user, [recipe_id])
+        if not recipes:
+            raise Http404
+        return Response(
+            RecipeInlineSerializer(
+                recipes[0],
+                context={"request": request},
+            ).data,
+            status=(
+                status.HTTP_201_CREATED
+                if recipes[0].added
+                else status.HTTP_200_OK
+            ),
+        )
+
+    def toggle_recipes(self, request, model):
+        """То же для списка рецептов {"recipes": [id, ...]}."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        recipe_ids = serializer.validated_data["recipes"]
+        if request.method == "DELETE":
+            remove_recipes(model, request.user, recipe_ids)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        with transaction.atomic():
+            recipes = add_recipes(model, request.user, recipe_ids)
+            found = {recipe.pk for recipe in recipes}
+            missing = sorted(set(recipe_ids) - found)
+            if missing:
+                transaction.set_rollback(True)
+                return Response(
+                    {
+                        "recipes": [
+                            "Рецепты с id "
+                            f"{', '.join(map(str, missing))} не существуют.",
+                        ],
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return Response(
+            RecipeInlineSerializer(
+                recipes,
+                many=True,
+                context={"request": request},
+            ).data,
+            status=status.HTTP_200_OK,
+        )
+
     @action(
         detail=True,
         methods=("POST", "DELETE"),
@@ -97,29 +226,17 @@ class RecipeViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def favorite(self, request, pk):
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-
-        if request.method == "POST":
-            serializer = FavoriteSerializer(data=data)
-            if serializer.is_valid():
-                serializer.save()
-                recipe = get_object_or_404(Recipe, pk=pk)
-                return Response(
-                    RecipeInlineSerializer(recipe).data,
-                    status=status.HTTP_201_CREATED,
-                )
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        favorite = Favorite.objects.filter(**data)
-        if favorite:
-            favorite.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({"errors": "Вы не добавили рецепт в избранное"})
+        return self.toggle_recipe(request, Favorite, pk)
+
+    @action(
+        detail=False,
+        methods=("POST", "DELETE"),
+        url_path="favorite",
+        url_name="favorite-many",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_many(self, request):
+        return self.toggle_recipes(request, Favorite)
 
     @action(
         detail=True,
@@ -128,37 +245,64 @@ class RecipeViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def shopping_cart(self, request, pk):
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-        if request.method == "POST":
-            serializer = ShoppingListSerializer(data=data)
-            if serializer.is_valid():
-                serializer.save()
-                recipe = get_object_or_404(Recipe, pk=pk)
-                return Response(
-                    RecipeInlineSerializer(recipe).data,
-                    status=status.HTTP_201_CREATED,
-                )
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        recipe_list = ShoppingList.objects.filter(**data)
-        if recipe_list:
-            recipe_list.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({"error": "Вы не добавляли рецепт в список покупок"})
+        return self.toggle_recipe(request, ShoppingList, pk)
+
+    @action(
+        detail=False,
+        methods=("POST", "DELETE"),
+        url_path="shopping_cart",
+        url_name="shopping-cart-many",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_many(self, request):
+        return self.toggle_recipes(request, ShoppingList)
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые сначала."""
+        pagination = FeedPagination()
+        cursor, limit = pagination.get_params(request)
+        recipe_ids = get_feed(request.user, cursor, limit + 1)
+        return pagination.get_paginated_response(
+            request,
+            recipe_cache.get_cards(request, recipe_ids[:limit]),
+            len(recipe_ids) > limit,
+        )
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        url_path="shopping_cart/totals",
+        url_name="shopping-cart-totals",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_totals(self, request):
+        """Итоги списка покупок в JSON без агрегации."""
+        return Response(get_shopping_list(user=request.user))
 
     @action(
         detail=False,
         methods=("GET",),
         url_path="download_shopping_cart",
         permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        list = get_shopping_list(user=request.user)
-        response = HttpResponse(list, content_type="text/plain")
-        response["Content-Disposition"] = 'attachment; filename="list.txt"'
+        """Список покупок в формате из ?format= (txt, csv, json)."""
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(get_shopping_list(user=request.user)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="list.{renderer.format}"'
+        )
         return response
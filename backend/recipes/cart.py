@@ -0,0 +1,133 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from recipes.models import RecipeIngredient, ShoppingCartItem, ShoppingList
+
+
+_local = threading.local()
+
+
+def handled_recipes() -> set:
+    """Рецепты, итоги корзин которых сейчас меняет вызывающий код."""
+    if not hasattr(_local, "recipe_ids"):
+        _local.recipe_ids = set()
+    return _local.recipe_ids
+
+
+@contextmanager
+def handling_cart_totals(recipe_ids):
+    """Отключает пересчёт итогов в сигналах для recipe_ids внутри блока."""
+    recipe_ids = set(recipe_ids) - handled_recipes()
+    handled_recipes().update(recipe_ids)
+    try:
+        yield
+    finally:
+        handled_recipes().difference_update(recipe_ids)
+
+
+def recipe_amounts(recipe_ids, sign: int = 1) -> dict:
+    """{ингредиент: суммарное количество} рецептов, со знаком sign."""
+    return {
+        row["ingredient_id"]: row["total"] * sign
+        for row in RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+        .values("ingredient_id")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    }
+
+
+def carting_users(recipe_id: int) -> list:
+    return list(
+        ShoppingList.objects.filter(recipe_id=recipe_id).values_list(
+            "user_id",
+            flat=True,
+        ),
+    )
+
+
+def change_cart_totals(user_ids, deltas: dict):
+    """Прибавляет deltas {ингредиент: количество} к итогам user_ids."""
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not user_ids or not deltas:
+        return
+    items = ShoppingCartItem.objects.filter(
+        user_id__in=user_ids,
+        ingredient_id__in=deltas,
+    )
+    added = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta > 0
+    ]
+    ShoppingCartItem.objects.bulk_create(
+        [
+            ShoppingCartItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=0,
+            )
+            for user_id in user_ids
+            for ingredient_id in added
+        ],
+        ignore_conflicts=True,
+    )
+    items.update(
+        amount=F("amount") + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+    items.filter(amount__lte=0).delete()
+
+
+def rebuild_cart_totals() -> list:
+    """Пересобирает итоги корзин; возвращает id расходившихся."""
+    with transaction.atomic():
+        actual = defaultdict(dict)
+        for row in (
+            RecipeIngredient.objects.filter(
+                recipe__shopping_list__isnull=False,
+            )
+            .values("recipe__shopping_list__user_id", "ingredient_id")
+            .annotate(total=Sum("amount"))
+            .order_by()
+        ):
+            user_id = row["recipe__shopping_list__user_id"]
+            actual[user_id][row["ingredient_id"]] = row["total"]
+        stored = defaultdict(dict)
+        for user_id, ingredient_id, amount in (
+            ShoppingCartItem.objects.select_for_update().values_list(
+                "user_id",
+                "ingredient_id",
+                "amount",
+            )
+        ):
+            stored[user_id][ingredient_id] = amount
+        stale = [
+            user_id
+            for user_id in set(actual) | set(stored)
+            if actual.get(user_id, {}) != stored.get(user_id, {})
+        ]
+        ShoppingCartItem.objects.filter(user_id__in=stale).delete()
+        ShoppingCartItem.objects.bulk_create(
+            [
+                ShoppingCartItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for user_id in stale
+                for ingredient_id, amount in actual.get(user_id, {}).items()
+            ],
+            batch_size=1000,
+        )
+    return stale
@@ -0,0 +1,109 @@
+import random
+import threading
+
+from core.counters import change_counter
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, FavoritesCounterShard, Recipe
+from users.models import Follow
+
+
+User = get_user_model()
+
+
+_local = threading.local()
+
+
+def deleting_recipes() -> set:
+    """Удаляемые сейчас рецепты: их счётчики избранного не меняются."""
+    if not hasattr(_local, "recipe_ids"):
+        _local.recipe_ids = set()
+    return _local.recipe_ids
+
+
+def change_favorites_count(recipe_id: int, delta: int):
+    # Каскад удаляет шарды раньше избранного, и новый шард для
+    # удаляемого рецепта нарушил бы внешний ключ.
+    if recipe_id in deleting_recipes():
+        return
+    shards = settings.FAVORITES_COUNTER_SHARDS
+    if not shards:
+        change_counter(
+            Recipe.objects.filter(pk=recipe_id),
+            "favorites_count",
+            delta,
+        )
+        return
+    shard = random.randrange(shards)
+    queryset = FavoritesCounterShard.objects.filter(
+        recipe_id=recipe_id,
+        shard=shard,
+    )
+    if not queryset.update(count=F("count") + delta):
+        FavoritesCounterShard.objects.bulk_create(
+            [FavoritesCounterShard(recipe_id=recipe_id, shard=shard)],
+            ignore_conflicts=True,
+        )
+        queryset.update(count=F("count") + delta)
+
+
+def with_favorites_total(queryset):
+    """Аннотирует favorites_total с учётом ещё не сведённых шардов."""
+    shards = (
+        FavoritesCounterShard.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(total=Sum("count"))
+        .values("total")
+    )
+    return queryset.annotate(
+        favorites_total=F("favorites_count") + Coalesce(Subquery(shards), 0),
+    )
+
+
+def _count_of(model, field: str):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+        ),
+        0,
+    )
+
+
+def reconcile_counters() -> dict:
+    """Пересчитывает счётчики и сводит шарды; возвращает расхождения."""
+    counters = (
+        (Recipe, "favorites_count", _count_of(Favorite, "recipe")),
+        (User, "recipes_count", _count_of(Recipe, "author")),
+        (User, "followers_count", _count_of(Follow, "following")),
+    )
+    # Связь и её счётчик пишутся в autocommit разными запросами:
+    # запись между ними может разойтись на единицу до следующей сверки.
+    drift = {}
+    with transaction.atomic():
+        # Строки шардов блокируются до пересчёта: приращение в уже
+        # существующий шард дождётся коммита сверки и уйдёт в новый.
+        shard_ids = list(
+            FavoritesCounterShard.objects.select_for_update().values_list(
+                "pk",
+                flat=True,
+            ),
+        )
+        for model, field, actual in counters:
+            stale = (
+                model.objects.annotate(actual=actual)
+                .exclude(**{field: F("actual")})
+                .values("pk")
+            )
+            drift[field] = model.objects.filter(pk__in=stale).update(
+                **{field: actual},
+            )
+        FavoritesCounterShard.objects.filter(pk__in=shard_ids).delete()
+    return drift
@@ -0,0 +1,204 @@
+"""Лента рецептов авторов, на которых подписан пользователь."""
+from itertools import islice
+
+from core.jobs import enqueue, job
+from django.conf import settings
+from django.db.models import Count
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow, User
+
+
+FAN_OUT_RECIPE = "recipes.fan_out_recipe"
+BACKFILL_TIMELINE = "recipes.backfill_timeline"
+BACKFILL_FOLLOWERS = "recipes.backfill_followers"
+CAP_TIMELINES = "recipes.cap_timelines"
+
+BATCH_SIZE = 1000
+
+
+def is_popular(followers_count: int) -> bool:
+    return followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def _insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def cap(users):
+    """Обрезает ленты users до FEED_TIMELINE_LENGTH записей."""
+    length = settings.FEED_TIMELINE_LENGTH
+    overflowing = (
+        TimelineEntry.objects.filter(user_id__in=users)
+        .values("user_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=length)
+        .order_by()
+        .values_list("user_id", flat=True)
+    )
+    for user_id in overflowing:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        cutoff = entries.order_by("-recipe_id").values_list(
+            "recipe_id",
+            flat=True,
+        )[length]
+        entries.filter(recipe_id__lte=cutoff).delete()
+
+
+@job(FAN_OUT_RECIPE)
+def fan_out_recipe(recipe_id: int):
+    """Добавляет рецепт в ленты подписчиков автора."""
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values("author_id", "author__followers_count")
+        .first()
+    )
+    if recipe is None or is_popular(recipe["author__followers_count"]):
+        return
+    author_id = recipe["author_id"]
+    followers = Follow.objects.filter(following_id=author_id).values_list(
+        "user_id",
+        flat=True,
+    )
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+        )
+        for user_id in followers.iterator()
+    )
+    enqueue(CAP_TIMELINES, author_id=author_id)
+
+
+@job(CAP_TIMELINES)
+def cap_timelines(author_id: int):
+    """Обрезает ленты подписчиков автора."""
+    cap(Follow.objects.filter(following_id=author_id).values("user_id"))
+
+
+@job(BACKFILL_TIMELINE)
+def backfill_timeline(user_id: int, author_id: int):
+    """Добавляет в ленту последние рецепты нового автора из подписок."""
+    if not Follow.objects.filter(
+        user_id=user_id,
+        following_id=author_id,
+    ).exists():
+        return
+    followers_count = (
+        User.objects.filter(pk=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    if followers_count is None or is_popular(followers_count):
+        return
+    recipe_ids = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by("-id")
+        .values_list("id", flat=True)[:settings.FEED_TIMELINE_LENGTH]
+    )
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+        )
+        for recipe_id in recipe_ids
+    )
+    cap([user_id])
+
+
+@job(BACKFILL_FOLLOWERS)
+def backfill_followers(author_id: int):
+    """Раскладывает по лентам подписчиков рецепты, пропущенные раскладкой."""
+    followers_count = (
+        User.objects.filter(pk=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    if followers_count is None or is_popular(followers_count):
+        return
+    recipe_ids = list(
+        Recipe.objects.filter(author_id=author_id)
+        .exclude(
+            id__in=TimelineEntry.objects.filter(author_id=author_id).values(
+                "recipe_id",
+            ),
+        )
+        .order_by("-id")
+        .values_list("id", flat=True)[:settings.FEED_TIMELINE_LENGTH],
+    )
+    if not recipe_ids:
+        return
+    followers = Follow.objects.filter(following_id=author_id)
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+        )
+        for user_id in followers.values_list("user_id", flat=True).iterator()
+        for recipe_id in recipe_ids
+    )
+    cap(followers.values("user_id"))
+
+
+def forget_author(user_id: int, author_id: int):
+    """Убирает из ленты рецепты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id,
+    ).delete()
+    followers_count = (
+        User.objects.filter(pk=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    threshold = settings.FEED_FANOUT_MAX_FOLLOWERS
+    # Счётчик может быть ещё не уменьшен: порядок обработчиков сигнала
+    # не задан, а задача проверит его сама.
+    if followers_count in (threshold, threshold + 1):
+        enqueue(BACKFILL_FOLLOWERS, author_id=author_id)
+
+
+def move_recipe(recipe_id: int):
+    """Пересобирает записи лент рецепта после смены его автора."""
+    TimelineEntry.objects.filter(recipe_id=recipe_id).delete()
+    enqueue(FAN_OUT_RECIPE, recipe_id=recipe_id)
+
+
+def get_feed(user, before=None, limit=10) -> list:
+    """id рецептов ленты user меньше before, по убыванию, не больше limit."""
+    following = Follow.objects.filter(user=user)
+    recipes = Recipe.objects.order_by("-id")
+    # Записи авторов, от которых пользователь уже отписался (задача
+    # раскладки могла отработать после forget_author), не показываются.
+    entries = TimelineEntry.objects.filter(
+        user=user,
+        author_id__in=following.values("following_id"),
+    ).order_by("-recipe_id")
+    if before is not None:
+        recipes = recipes.filter(id__lt=before)
+        entries = entries.filter(recipe_id__lt=before)
+    max_following = settings.FEED_READ_MAX_FOLLOWING
+    if following[:max_following + 1].count() > max_following:
+        return list(
+            recipes.filter(
+                author_id__in=following.values("following_id"),
+            ).values_list("id", flat=True)[:limit],
+        )
+    recipe_ids = set(entries.values_list("recipe_id", flat=True)[:limit])
+    popular = following.filter(
+        following__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values("following_id")
+    recipe_ids.update(
+        recipes.filter(author_id__in=popular).values_list(
+            "id",
+            flat=True,
+        )[:limit],
+    )
+    return sorted(recipe_ids, reverse=True)[:limit]
@@ -0,0 +1,22 @@
+from core.images import make_variants
+from core.jobs import job
+from recipes.api import cache as recipe_cache
+from recipes.models import Recipe
+
+
+RENDER_IMAGE_VARIANTS = "recipes.render_image_variants"
+
+
+@job(RENDER_IMAGE_VARIANTS)
+def render_image_variants(recipe_id: int):
+    """Готовит уменьшенные копии фото рецепта и сохраняет их имена."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only("image").first()
+    if recipe is None or not recipe.image:
+        return
+    variants = make_variants(recipe.image.storage, recipe.image.name)
+    updated = Recipe.objects.filter(
+        pk=recipe_id,
+        image=recipe.image.name,
+    ).update(image_variants=variants)
+    if updated:
+        recipe_cache.invalidate_recipes([recipe_id], pages=False)
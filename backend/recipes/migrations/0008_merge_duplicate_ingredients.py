@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 19:32
+
+from django.db import migrations
+from django.db.models import Count, F, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Сливает ингредиенты с одинаковыми названием и единицами.
+
+    Строки рецептов переносятся на ингредиент с наименьшим id; если у
+    рецепта уже есть этот ингредиент, количества складываются.
+    """
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    groups = (
+        Ingredient.objects.values("name", "measurement_unit")
+        .annotate(keep=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in groups:
+        duplicates = list(
+            Ingredient.objects.filter(
+                name=group["name"],
+                measurement_unit=group["measurement_unit"],
+            )
+            .exclude(pk=group["keep"])
+            .values_list("pk", flat=True),
+        )
+        for row in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicates,
+        ):
+            merged = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id,
+                ingredient_id=group["keep"],
+            ).update(amount=F("amount") + row.amount)
+            if merged:
+                row.delete()
+            else:
+                row.ingredient_id = group["keep"]
+                row.save(update_fields=["ingredient"])
+        Ingredient.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,42 @@
 import re
 
+from core.models import PreserveDenormalizedMixin
+from core.storage import ContentAddressedStorage
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import RowNumber
 
 
 User = get_user_model()
 
 HEX_PATTERN = '^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$'
 
+# Конфигурация полнотекстового поиска PostgreSQL: контент на русском.
+SEARCH_CONFIG = "russian"
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -41,7 +68,128 @@ class Tag(models.Model):
             raise ValidationError("Invalid HEX color code")
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_viewer_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart для user."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(
+                    False,
+                    output_field=BooleanField(),
+                ),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(
+                    user_id=user.pk,
+                    recipe=OuterRef("pk"),
+                ),
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingList.objects.filter(
+                    user_id=user.pk,
+                    recipe=OuterRef("pk"),
+                ),
+            ),
+        )
+
+    def with_related(self):
+        """Подгружает всё, что нужно для GetRecipeSerializer."""
+        return (
+            self.defer("search_vector")
+            .select_related("author")
+            .prefetch_related(
+                "tags",
+                Prefetch(
+                    "recipeingredient",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient",
+                    ),
+                ),
+            )
+        )
+
+    def latest_per_author(self, author_ids, limit=None):
+        """Последние limit рецептов каждого автора одним запросом."""
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return queryset
+        queryset = queryset.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F("author_id")],
+                order_by=F("id").desc(),
+            ),
+        )
+        sql, params = queryset.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) AS "latest" '
+            f'WHERE "row_number" <= %s ORDER BY "id" DESC',
+            (*params, limit),
+        )
+
+    def search(self, value):
+        """Поиск по названию, описанию и ингредиентам с ранжированием."""
+        if connections[self.db].vendor == "postgresql":
+            query = SearchQuery(
+                value,
+                config=SEARCH_CONFIG,
+                search_type="websearch",
+            )
+            return (
+                self.filter(search_vector=query)
+                .annotate(rank=SearchRank(F("search_vector"), query))
+                .order_by("-rank", "-id")
+            )
+        return (
+            self.annotate(
+                in_ingredients=Exists(
+                    RecipeIngredient.objects.filter(
+                        recipe=OuterRef("pk"),
+                        ingredient__name__icontains=value,
+                    ),
+                ),
+                rank=Case(
+                    When(name__icontains=value, then=Value(2)),
+                    When(text__icontains=value, then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+            )
+            .filter(
+                Q(name__icontains=value)
+                | Q(text__icontains=value)
+                | Q(in_ingredients=True),
+            )
+            .order_by("-rank", "-id")
+        )
+
+    def update_search_vector(self):
+        """Пересчитывает search_vector; вне PostgreSQL ничего не делает."""
+        if connections[self.db].vendor != "postgresql":
+            return 0
+        ingredient_names = (
+            RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(names=StringAgg("ingredient__name", " "))
+            .values("names")
+        )
+        return self.update(
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+                + SearchVector(
+                    Subquery(ingredient_names),
+                    weight="C",
+                    config=SEARCH_CONFIG,
+                )
+            ),
+        )
+
+
+class Recipe(PreserveDenormalizedMixin, models.Model):
     author = models.ForeignKey(
         verbose_name="Автор",
         to=User,
@@ -58,6 +206,12 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="Фото блюда",
         upload_to="recipes/images",
+        storage=ContentAddressedStorage(),
+    )
+    image_variants = models.JSONField(
+        verbose_name="Уменьшенные копии фото",
+        default=dict,
+        editable=False,
     )
     tags = models.ManyToManyField(
         verbose_name="Тэги",
@@ -73,15 +227,41 @@ class Recipe(models.Model):
         verbose_name="Время приготовления в минутах",
         validators=[MinValueValidator(1, 'Мин. время 1 минута.'), ]
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="В избранном у",
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор",
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=["author", "-id"],
+                name="recipe_author_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        # Автор на момент загрузки: после его смены сигнал пересобирает
+        # ленты и счётчики рецептов.
+        recipe.loaded_author_id = recipe.__dict__.get("author_id")
+        return recipe
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -97,6 +277,12 @@ class Ingredient(models.Model):
         verbose_name = "Ингридиент"
         verbose_name_plural = "Ингридиенты"
         ordering = ("-id",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "measurement_unit"],
+                name="unique_ingredient",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -164,6 +350,29 @@ class Favorite(models.Model):
         return f"{self.user.username} {self.recipe}"
 
 
+class FavoritesCounterShard(models.Model):
+    """Часть счётчика избранного для популярных рецептов."""
+
+    recipe = models.ForeignKey(
+        verbose_name="Рецепт",
+        to=Recipe,
+        related_name="favorites_shards",
+        on_delete=models.CASCADE,
+    )
+    shard = models.PositiveSmallIntegerField(verbose_name="Шард")
+    count = models.IntegerField(verbose_name="Прирост", default=0)
+
+    class Meta:
+        verbose_name = "Шард счётчика избранного"
+        verbose_name_plural = "Шарды счётчика избранного"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "shard"],
+                name="unique_favorites_shard",
+            ),
+        ]
+
+
 class ShoppingList(models.Model):
     user = models.ForeignKey(
         verbose_name="Пользователь",
@@ -187,3 +396,74 @@ class ShoppingList(models.Model):
                 name="unique_shoppinglist",
             ),
         ]
+
+
+class ShoppingCartItem(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя."""
+
+    user = models.ForeignKey(
+        verbose_name="Пользователь",
+        to=User,
+        related_name="shopping_cart_items",
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        verbose_name="Ингредиент",
+        to=Ingredient,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    amount = models.DecimalField(
+        verbose_name="Количество",
+        max_digits=12,
+        decimal_places=2,
+    )
+
+    class Meta:
+        verbose_name = "Итог списка покупок"
+        verbose_name_plural = "Итоги списков покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_cart_item",
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте подписок пользователя (recipes.feed)."""
+
+    user = models.ForeignKey(
+        verbose_name="Пользователь",
+        to=User,
+        related_name="timeline",
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        verbose_name="Рецепт",
+        to=Recipe,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        verbose_name="Автор",
+        to=User,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи лент"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_timeline_entry",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "author"],
+                name="timeline_user_author_idx",
+            ),
+        ]
@@ -0,0 +1,247 @@
+import threading
+from collections import Counter
+
+from core.cache import bump_version_on_commit
+from core.counters import change_counter
+from core.jobs import enqueue
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from recipes.api import cache as recipe_cache
+from recipes.api.ingredient_index import INGREDIENTS_VERSION
+from recipes.api.pagination import RECIPE_COUNT_VERSION
+from recipes.api.services import invalidate_carts
+from recipes.cart import (
+    carting_users,
+    change_cart_totals,
+    handled_recipes,
+    recipe_amounts,
+)
+from recipes.counters import change_favorites_count, deleting_recipes
+from recipes.feed import (
+    BACKFILL_TIMELINE,
+    FAN_OUT_RECIPE,
+    forget_author,
+    move_recipe,
+)
+from recipes.images import RENDER_IMAGE_VARIANTS
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+)
+from users.models import Follow
+
+
+User = get_user_model()
+
+
+_pending = threading.local()
+
+
+def _flush_search_vector():
+    recipe_ids = getattr(_pending, "recipe_ids", None)
+    if recipe_ids:
+        _pending.recipe_ids = set()
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+
+
+def update_search_vector(recipe_ids):
+    """Пересчитывает поисковый вектор рецептов после коммита."""
+    if not hasattr(_pending, "recipe_ids"):
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(_flush_search_vector)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipe_cache.invalidate_recipes([instance.pk])
+    if kwargs.get("created", True):
+        bump_version_on_commit(RECIPE_COUNT_VERSION)
+    if kwargs["signal"] is post_save:
+        update_search_vector([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    image = instance.image.name
+    if image and instance.image_variants.get("source") != image:
+        enqueue(RENDER_IMAGE_VARIANTS, recipe_id=instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        enqueue(FAN_OUT_RECIPE, recipe_id=instance.pk)
+        change_counter(
+            User.objects.filter(pk=instance.author_id),
+            "recipes_count",
+            1,
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_author_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, "loaded_author_id", None)
+    if created or previous is None or previous == instance.author_id:
+        return
+    instance.loaded_author_id = instance.author_id
+    move_recipe(instance.pk)
+    change_counter(User.objects.filter(pk=previous), "recipes_count", -1)
+    change_counter(
+        User.objects.filter(pk=instance.author_id),
+        "recipes_count",
+        1,
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Каскад удалит строки корзин и ингредиентов рецепта в любом порядке,
+    # поэтому рецепт вычитается из итогов корзин целиком до каскада.
+    handled_recipes().add(instance.pk)
+    deleting_recipes().add(instance.pk)
+    users = carting_users(instance.pk)
+    change_cart_totals(users, recipe_amounts([instance.pk], -1))
+    invalidate_carts(users)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    handled_recipes().discard(instance.pk)
+    deleting_recipes().discard(instance.pk)
+    change_counter(
+        User.objects.filter(pk=instance.author_id),
+        "recipes_count",
+        -1,
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        change_favorites_count(instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    change_favorites_count(instance.recipe_id, -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, Recipe):
+        recipe_cache.invalidate_recipes([instance.pk])
+    else:
+        recipe_cache.invalidate_all()
+    bump_version_on_commit(RECIPE_COUNT_VERSION)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_cache.invalidate_recipes([instance.recipe_id], pages=False)
+    update_search_vector([instance.recipe_id])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, **kwargs):
+    instance.saved_amount = (
+        RecipeIngredient.objects.filter(pk=instance.pk)
+        .values_list("ingredient_id", "amount")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_cart_changed(sender, instance, **kwargs):
+    if instance.recipe_id in handled_recipes():
+        return
+    deltas = Counter()
+    if kwargs["signal"] is post_save:
+        deltas[instance.ingredient_id] += instance.amount
+        if instance.saved_amount:
+            ingredient_id, amount = instance.saved_amount
+            deltas[ingredient_id] -= amount
+    else:
+        deltas[instance.ingredient_id] -= instance.amount
+    users = carting_users(instance.recipe_id)
+    change_cart_totals(users, deltas)
+    invalidate_carts(users)
+
+
+@receiver(post_save, sender=ShoppingList)
+def shopping_list_added(sender, instance, created, **kwargs):
+    if created and instance.recipe_id not in handled_recipes():
+        change_cart_totals(
+            [instance.user_id],
+            recipe_amounts([instance.recipe_id]),
+        )
+        invalidate_carts([instance.user_id])
+
+
+@receiver(post_delete, sender=ShoppingList)
+def shopping_list_removed(sender, instance, **kwargs):
+    if instance.recipe_id not in handled_recipes():
+        change_cart_totals(
+            [instance.user_id],
+            recipe_amounts([instance.recipe_id], -1),
+        )
+        invalidate_carts([instance.user_id])
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def catalog_changed(sender, instance, **kwargs):
+    recipe_cache.invalidate_all()
+    bump_version_on_commit(recipe_cache.CATALOG_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_version_on_commit(INGREDIENTS_VERSION)
+    if kwargs["signal"] is post_save:
+        update_search_vector(
+            Recipe.objects.filter(ingredients=instance).values_list(
+                "id",
+                flat=True,
+            ),
+        )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, **kwargs):
+    if not created:
+        recipe_cache.invalidate_recipes(
+            instance.recipes.values_list("id", flat=True),
+            pages=False,
+        )
+
+
+@receiver(post_save, sender=Follow)
+def author_followed(sender, instance, created, **kwargs):
+    if created:
+        enqueue(
+            BACKFILL_TIMELINE,
+            user_id=instance.user_id,
+            author_id=instance.following_id,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def author_unfollowed(sender, instance, **kwargs):
+    forget_author(instance.user_id, instance.following_id)
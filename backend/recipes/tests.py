@@ -0,0 +1,566 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from core.cache import bump_version
+from core.models import ImportProgress
+from core.pagination import CountingLimitPagination
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from recipes.counters import reconcile_counters, with_favorites_total
+from recipes.models import (
+    Favorite,
+    FavoritesCounterShard,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCartItem,
+    ShoppingList,
+    Tag,
+)
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import Follow, User
+
+
+def create_user(username):
+    return User.objects.create(username=username, email=f"{username}@x.ru")
+
+
+def create_recipe(author, name="Рецепт", text="Описание", ingredients=()):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text=text,
+        cooking_time=10,
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    return recipe
+
+
+class BulkToggleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("buyer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        author = create_user("author")
+        self.salt = Ingredient.objects.create(
+            name="соль",
+            measurement_unit="г",
+        )
+        self.water = Ingredient.objects.create(
+            name="вода",
+            measurement_unit="мл",
+        )
+        self.soup = create_recipe(
+            author,
+            ingredients=((self.salt, 5), (self.water, 500)),
+        )
+        self.tea = create_recipe(author, ingredients=((self.water, 200),))
+
+    def totals(self):
+        return dict(
+            ShoppingCartItem.objects.filter(user=self.user).values_list(
+                "ingredient_id",
+                "amount",
+            ),
+        )
+
+    def test_cart_counts_each_recipe_once(self):
+        url = "/api/recipes/shopping_cart/"
+        response = self.client.post(
+            url,
+            {"recipes": [self.soup.pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            url,
+            {"recipes": [self.soup.pk, self.tea.pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            ShoppingList.objects.filter(user=self.user).count(),
+            2,
+        )
+        self.assertEqual(
+            self.totals(),
+            {self.salt.pk: Decimal(5), self.water.pk: Decimal(700)},
+        )
+        response = self.client.delete(
+            url,
+            {"recipes": [self.soup.pk, self.tea.pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totals(), {})
+
+    def test_favorites_counter_counts_each_recipe_once(self):
+        url = "/api/recipes/favorite/"
+        for recipe_ids in ([self.soup.pk], [self.soup.pk, self.tea.pk]):
+            response = self.client.post(
+                url,
+                {"recipes": recipe_ids},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 2)
+        self.soup.refresh_from_db()
+        self.tea.refresh_from_db()
+        self.assertEqual(self.soup.favorites_count, 1)
+        self.assertEqual(self.tea.favorites_count, 1)
+
+    def test_missing_recipe_rolls_back_whole_batch(self):
+        response = self.client.post(
+            "/api/recipes/shopping_cart/",
+            {"recipes": [self.soup.pk, 999999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ShoppingList.objects.filter(user=self.user).exists())
+        self.assertEqual(self.totals(), {})
+
+    def test_ingredient_edit_updates_carts(self):
+        self.client.post(
+            "/api/recipes/shopping_cart/",
+            {"recipes": [self.soup.pk]},
+            format="json",
+        )
+        author_client = APIClient()
+        author_client.force_authenticate(self.soup.author)
+        response = author_client.patch(
+            f"/api/recipes/{self.soup.pk}/",
+            {"ingredients": [{"id": self.water.pk, "amount": 300}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), {self.water.pk: Decimal(300)})
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = create_user("reader")
+        self.author = create_user("writer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def feed_ids(self):
+        response = self.client.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_follow_then_unfollow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = create_recipe(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.reader, following=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = create_recipe(self.author)
+        self.assertEqual(self.feed_ids(), [new.pk, old.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.get(
+                user=self.reader,
+                following=self.author,
+            ).delete()
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_recipes_of_popular_author_survive_demotion(self):
+        other = create_user("other")
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.reader, following=self.author)
+            Follow.objects.create(user=other, following=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author)
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.get(user=other, following=self.author).delete()
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+
+
+class PaginationOrderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        author = create_user("author")
+        self.by_name = create_recipe(author, name="Борщ", text="Суп")
+        self.other = create_recipe(author, name="Щи", text="Суп")
+        self.by_text = create_recipe(author, name="Суп", text="Как Борщ")
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_cursor_and_page_agree_without_search(self):
+        expected = [self.by_text.pk, self.other.pk, self.by_name.pk]
+        self.assertEqual(self.ids(self.client.get("/api/recipes/")), expected)
+        response = self.client.get("/api/recipes/?cursor=&limit=2")
+        self.assertEqual(self.ids(response), expected[:2])
+        self.assertNotIn("count", response.data)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.ids(response), expected[2:])
+
+    def test_search_keeps_rank_order_in_cursor_mode(self):
+        expected = [self.by_name.pk, self.by_text.pk]
+        for url in (
+            "/api/recipes/?search=Борщ",
+            "/api/recipes/?search=Борщ&cursor=",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(self.ids(response), expected)
+            self.assertEqual(response.data["count"], 2)
+
+
+@override_settings(FAVORITES_COUNTER_SHARDS=4)
+class FavoritesCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user("author")
+        self.reader = create_user("reader")
+        self.recipe = create_recipe(self.author)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+
+    def test_shards_add_up_to_favorites(self):
+        self.assertEqual(
+            with_favorites_total(Recipe.objects.all())
+            .get(pk=self.recipe.pk)
+            .favorites_total,
+            1,
+        )
+        self.assertEqual(reconcile_counters()["favorites_count"], 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertFalse(FavoritesCounterShard.objects.exists())
+
+    def test_deleting_favorited_recipe(self):
+        self.recipe.delete()
+        connection.check_constraints()
+        self.assertFalse(FavoritesCounterShard.objects.exists())
+
+    def test_deleting_author_of_favorited_recipe(self):
+        self.author.delete()
+        connection.check_constraints()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(FavoritesCounterShard.objects.exists())
+
+
+class ImportRecipesTests(TestCase):
+    def setUp(self):
+        create_user("author")
+        Tag.objects.create(name="Суп", color="#000001", slug="soup")
+        file, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(file)
+        self.addCleanup(os.remove, self.path)
+
+    def recipe(self, name, author="author@x.ru"):
+        return {
+            "author": author,
+            "name": name,
+            "text": "Описание",
+            "image": "",
+            "cooking_time": 10,
+            "tags": ["soup"],
+            "ingredients": [
+                {"name": "соль", "measurement_unit": "г", "amount": "5"},
+            ],
+        }
+
+    def write(self, *items):
+        with open(self.path, "w", encoding="UTF-8") as file:
+            for item in items:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def run_import(self, *args):
+        call_command("import_recipes", self.path, *args, stdout=StringIO())
+
+    def test_missing_field_reports_line(self):
+        broken = self.recipe("Борщ")
+        del broken["tags"]
+        self.write(self.recipe("Щи"), broken)
+        message = "Строка 2: нет полей tags"
+        with self.assertRaisesMessage(CommandError, message):
+            self.run_import()
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_resume_skips_committed_chunks(self):
+        self.write(
+            self.recipe("Щи"),
+            self.recipe("Борщ"),
+            self.recipe("Уха", author="nobody@x.ru"),
+        )
+        with self.assertRaises(CommandError):
+            self.run_import("--chunk-size=2")
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportProgress.objects.get().line, 3)
+        self.write(self.recipe("Щи"), self.recipe("Борщ"), self.recipe("Уха"))
+        self.run_import("--chunk-size=2", "--resume")
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("name", flat=True)),
+            ["Борщ", "Уха", "Щи"],
+        )
+        self.assertFalse(ImportProgress.objects.exists())
+
+
+class RecipeAdminSearchTests(TestCase):
+    def test_finds_recipes_by_part_of_author_username(self):
+        admin = User.objects.create_superuser("admin@x.ru", "password")
+        self.client.force_login(admin)
+        recipe = create_recipe(create_user("ivanov"), name="Щи")
+        create_recipe(create_user("petrov"), name="Борщ")
+        response = self.client.get(
+            "/admin/recipes/recipe/",
+            {"q": "iva"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context["cl"].result_list),
+            [recipe],
+        )
+
+
+class IngredientSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name in ("фасоль", "Соус", "соль", "солод", "перец"):
+            Ingredient.objects.create(name=name, measurement_unit="г")
+
+    def names(self, query):
+        response = self.client.get("/api/ingredients/", {"name": query})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient["name"] for ingredient in response.data]
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        self.assertEqual(
+            self.names("со"),
+            ["солод", "соль", "Соус", "фасоль"],
+        )
+
+    def test_index_is_rebuilt_after_ingredient_write(self):
+        self.assertEqual(self.names("сод"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            soda = Ingredient.objects.create(
+                name="сода",
+                measurement_unit="г",
+            )
+        self.assertEqual(self.names("сод"), ["сода"])
+        with self.captureOnCommitCallbacks(execute=True):
+            soda.delete()
+        self.assertEqual(self.names("сод"), [])
+
+
+class RecipeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user("author")
+        self.recipe = create_recipe(self.author, name="Щи")
+
+    def get(self, url, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.get("/api/recipes/")
+        with self.assertNumQueries(0):
+            self.get("/api/recipes/")
+
+    def test_recipe_edit_invalidates_card_and_page(self):
+        detail = f"/api/recipes/{self.recipe.pk}/"
+        self.get("/api/recipes/")
+        self.get(detail)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(detail, {"name": "Борщ"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(detail)["name"], "Борщ")
+        self.assertEqual(
+            self.get("/api/recipes/")["results"][0]["name"],
+            "Борщ",
+        )
+
+    def test_new_recipe_invalidates_pages(self):
+        self.assertEqual(self.get("/api/recipes/")["count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, name="Борщ")
+        data = self.get("/api/recipes/")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][0]["id"], recipe.pk)
+
+    def test_viewer_flags_are_not_cached_in_cards(self):
+        reader = create_user("reader")
+        Favorite.objects.create(user=reader, recipe=self.recipe)
+        anonymous = self.get("/api/recipes/")["results"][0]
+        own = self.get("/api/recipes/", reader)["results"][0]
+        self.assertFalse(anonymous["is_favorited"])
+        self.assertTrue(own["is_favorited"])
+
+
+class CountStrategyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user("author")
+        create_recipe(self.author)
+
+    def count(self, strategy, **params):
+        class Pagination(CountingLimitPagination):
+            count_strategy = strategy
+            count_version = "test-count"
+            count_uncached_params = ("is_favorited",)
+
+        paginator = Pagination()
+        request = Request(APIRequestFactory().get("/", params))
+        paginator.paginate_queryset(Recipe.objects.all(), request)
+        data = paginator.get_paginated_response([]).data
+        return data["count"], data["count_is_exact"]
+
+    def test_exact_counts_every_time(self):
+        self.assertEqual(self.count("exact"), (1, True))
+        create_recipe(self.author)
+        self.assertEqual(self.count("exact"), (2, True))
+
+    def test_cached_count_lives_until_version_bump(self):
+        self.assertEqual(self.count("cached"), (1, True))
+        create_recipe(self.author)
+        self.assertEqual(self.count("cached"), (1, True))
+        self.assertEqual(self.count("cached", name="x"), (2, True))
+        self.assertEqual(self.count("cached", is_favorited=1), (2, True))
+        bump_version("test-count")
+        self.assertEqual(self.count("cached"), (2, True))
+
+    def test_estimate_falls_back_to_exact_without_postgresql(self):
+        self.assertEqual(self.count("estimate"), (1, True))
+
+
+class ImportIngredientsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+
+    def run_import(self, suffix, content, *args):
+        file, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(file, "w", encoding="UTF-8") as output:
+            output.write(content)
+        self.addCleanup(os.remove, path)
+        stdout = StringIO()
+        call_command("import_ingredients", path, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def ingredients(self):
+        return set(
+            Ingredient.objects.values_list("name", "measurement_unit"),
+        )
+
+    def test_csv_skips_repeated_and_existing_rows(self):
+        output = self.run_import(
+            ".csv",
+            "соль,г\nперец,г\nперец,г\nмолоко,мл\n",
+            "--chunk-size=1",
+        )
+        self.assertIn("4 строк, повторов в файле 1, уже в базе 1", output)
+        self.assertEqual(
+            self.ingredients(),
+            {("соль", "г"), ("перец", "г"), ("молоко", "мл")},
+        )
+        response = self.client.get("/api/ingredients/", {"name": "пер"})
+        self.assertEqual([row["name"] for row in response.data], ["перец"])
+
+    def test_json_is_read_in_parts(self):
+        items = [
+            {"name": f"специя {number}", "measurement_unit": "г"}
+            for number in range(50)
+        ]
+        with mock.patch(
+            "core.management.commands.import_ingredients.READ_SIZE",
+            64,
+        ):
+            self.run_import(".json", json.dumps(items, ensure_ascii=False))
+        self.assertEqual(Ingredient.objects.count(), 51)
+
+    def test_json_reports_line_of_malformed_record(self):
+        content = (
+            '[\n{"name": "перец", "measurement_unit": "г"},\n'
+            '{"name": "молоко"}\n]'
+        )
+        with self.assertRaisesMessage(CommandError, "Строка 3:"):
+            self.run_import(".json", content)
+
+    def test_dry_run_writes_nothing(self):
+        output = self.run_import(".csv", "перец,г\n", "--dry-run")
+        self.assertIn("+ перец, г", output)
+        self.assertEqual(self.ingredients(), {("соль", "г")})
+
+
+class ShoppingListDownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("buyer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        recipe = create_recipe(self.user, ingredients=((salt, 5),))
+        ShoppingList.objects.create(user=self.user, recipe=recipe)
+
+    def download(self, **kwargs):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            **kwargs,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_text_is_the_default(self):
+        response, content = self.download()
+        self.assertEqual(
+            response["Content-Type"],
+            "text/plain; charset=utf-8",
+        )
+        self.assertIn('filename="list.txt"', response["Content-Disposition"])
+        self.assertEqual(content, "соль(г) - 5.00\n")
+
+    def test_format_parameter_selects_csv_and_json(self):
+        response, content = self.download(data={"format": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            content.splitlines(),
+            ["name,measurement_unit,amount", "соль,г,5.00"],
+        )
+        response, content = self.download(data={"format": "json"})
+        self.assertIn('filename="list.json"', response["Content-Disposition"])
+        self.assertEqual(
+            json.loads(content),
+            [
+                {
+                    "id": Ingredient.objects.get().pk,
+                    "name": "соль",
+                    "measurement_unit": "г",
+                    "amount": "5.00",
+                },
+            ],
+        )
+
+    def test_accept_header_selects_format(self):
+        response, _ = self.download(HTTP_ACCEPT="text/csv")
+        self.assertIn('filename="list.csv"', response["Content-Disposition"])
+
+    def test_unknown_format_is_not_found(self):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            {"format": "xml"},
+        )
+        self.assertEqual(response.status_code, 404)
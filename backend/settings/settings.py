@@ -83,9 +83,93 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", default="postgres"),
         "HOST": os.getenv("DB_HOST", default="localhost"),
         "PORT": os.getenv("DB_PORT", default="5432"),
+        # Сколько секунд соединение живёт после запроса; 0 — закрывать
+        # сразу.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", default=60)),
     },
 }
 
+# Версии ключей, карточки и итоги корзин общие для web, web-async,
+# worker и management-команд, поэтому в развёртывании кэш — общий
+# memcached (infra/docker-compose.yml). Локальный кэш процесса годится
+# только для одного процесса при разработке.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
+    },
+}
+
+# Время жизни кэша карточек рецептов в секундах, 0 отключает кэш.
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", default=300))
+
+# Подсчёт count в выдаче рецептов: exact, cached или estimate
+# (оценка планировщика PostgreSQL выше RECIPE_COUNT_ESTIMATE_THRESHOLD).
+RECIPE_COUNT_STRATEGY = os.getenv("RECIPE_COUNT_STRATEGY", default="cached")
+RECIPE_COUNT_CACHE_TIMEOUT = int(
+    os.getenv("RECIPE_COUNT_CACHE_TIMEOUT", default=60),
+)
+RECIPE_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv("RECIPE_COUNT_ESTIMATE_THRESHOLD", default=10000),
+)
+
+# Сколько секунд клиенты и nginx могут не перепроверять теги и
+# ингредиенты; после этого они перепроверяются по ETag.
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", default=300))
+
+# Число шардов счётчика избранного; 0 — писать прямо в строку рецепта.
+FAVORITES_COUNTER_SHARDS = int(
+    os.getenv("FAVORITES_COUNTER_SHARDS", default=0),
+)
+
+# Число потоков для запросов к базе из асинхронных представлений; у
+# каждого потока своё соединение.
+ASYNC_DB_THREADS = int(os.getenv("ASYNC_DB_THREADS", default=10))
+
+# Максимальный размер загружаемого изображения в байтах.
+IMAGE_MAX_SIZE = int(os.getenv("IMAGE_MAX_SIZE", default=10 * 1024 * 1024))
+# Предел числа пикселей: маленький файл может распаковаться в огромное
+# изображение, и такие файлы отклоняются до декодирования.
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", default=40_000_000))
+# Файлы из multipart/form-data сразу пишутся во временный файл на диске.
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Выдавать при входе подписанные токены вместо токенов из базы.
+# Токены из базы принимаются в обоих режимах.
+SIGNED_AUTH_TOKENS = bool(int(os.getenv("SIGNED_AUTH_TOKENS", default=0)))
+# Сколько секунд поколение токенов пользователя живёт в кэше. Отзыв
+# сбрасывает его из кэша; с локальным кэшем процесса другие процессы
+# увидят отзыв не позже чем через это время.
+SIGNED_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv("SIGNED_TOKEN_CACHE_TIMEOUT", default=60),
+)
+
+# Лента подписок: сколько рецептов хранится в ленте пользователя, с
+# какого числа подписчиков рецепты автора не раскладываются по лентам, а
+# подмешиваются при чтении, и с какого числа подписок лента пользователя
+# целиком собирается при чтении.
+FEED_TIMELINE_LENGTH = int(os.getenv("FEED_TIMELINE_LENGTH", default=500))
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv("FEED_FANOUT_MAX_FOLLOWERS", default=10000),
+)
+FEED_READ_MAX_FOLLOWING = int(
+    os.getenv("FEED_READ_MAX_FOLLOWING", default=2000),
+)
+
+# Очередь задач core.Job: число попыток, базовая пауза перед повтором
+# (удваивается с каждой попыткой) и через сколько секунд задачу,
+# зависшую в работе, можно забрать снова.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", default=5))
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", default=10))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", default=600))
+# Выполнять задачи сразу после коммита, без воркера.
+JOBS_RUN_INLINE = bool(int(os.getenv("JOBS_RUN_INLINE", default=0)))
+
 
 # Password validation
 
@@ -146,7 +230,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.SignedTokenAuthentication",
     ),
     "PAGE_SIZE": 5,
     "DEFAULT_PAGINATION_CLASS": "core.pagination.LimitPagination",
@@ -10,7 +10,14 @@ api_urlpatterns = [
     path("", include(("users.api.urls", "users"))),
 ]
 
+# Асинхронные версии чтения; обслуживаются ASGI-приложением.
+async_api_urlpatterns = [
+    path("", include(("recipes.api.async_urls", "recipes-async"))),
+    path("", include(("users.api.async_urls", "users-async"))),
+]
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/async/", include(async_api_urlpatterns)),
     path("api/", include(api_urlpatterns)),
 ]
@@ -0,0 +1,11 @@
+from django.urls import path
+from users.api import async_views
+
+
+urlpatterns = [
+    path(
+        "users/subscriptions/",
+        async_views.subscriptions,
+        name="users-subscriptions",
+    ),
+]
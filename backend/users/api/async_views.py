@@ -0,0 +1,45 @@
+from core.async_views import (
+    async_api_view,
+    filter_queryset,
+    paginate,
+    run_sync,
+)
+from core.pagination import HybridPagination
+from recipes.api.viewer import ViewerState
+from rest_framework.exceptions import NotAuthenticated
+from users.api.filterset import UserFilter
+from users.api.serializers import FollowSerializer
+from users.api.viewsets import UserViewSet
+from users.models import Follow, User
+
+
+def load_subscriptions(request) -> dict:
+    if not request.user.is_authenticated:
+        raise NotAuthenticated
+    authors = User.objects.filter(
+        id__in=Follow.objects.filter(user_id=request.user.pk).values_list(
+            "following",
+            flat=True,
+        ),
+    )
+    authors = filter_queryset(UserFilter, authors, request)
+
+    def serialize(page):
+        viewer = ViewerState(request.user)
+        viewer.mark_followed(author.pk for author in page)
+        context = {
+            "recipes": UserViewSet.get_recipes_preview(
+                page,
+                request.query_params.get("recipes_limit"),
+            ),
+            "request": request,
+            "viewer": viewer,
+        }
+        return FollowSerializer(page, many=True, context=context).data
+
+    return paginate(HybridPagination, authors, request, serialize)
+
+
+@async_api_view
+async def subscriptions(request):
+    return await run_sync(load_subscriptions, request)
@@ -0,0 +1,30 @@
+from django_filters import BaseInFilter, CharFilter, FilterSet, NumberFilter
+from rest_framework.exceptions import ValidationError
+from users.models import User
+
+
+# Сколько пользователей можно запросить одной пачкой через id__in.
+MAX_BULK_IDS = 100
+
+
+class NumberInFilter(BaseInFilter, NumberFilter):
+    pass
+
+
+class UserFilter(FilterSet):
+    search = CharFilter(method="filter_search")
+    id__in = NumberInFilter(method="filter_ids")
+
+    class Meta:
+        model = User
+        fields = ["search", "id__in"]
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_ids(self, queryset, name, value):
+        if len(value) > MAX_BULK_IDS:
+            raise ValidationError(
+                {name: [f"Не больше {MAX_BULK_IDS} id за запрос."]},
+            )
+        return queryset.filter(id__in=value)
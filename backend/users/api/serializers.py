@@ -1,6 +1,7 @@
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from recipes.api import serializers as recipe_serializers
+from recipes.api.viewer import ViewerListSerializer, get_viewer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from users.models import Follow, User
@@ -25,6 +26,7 @@ class UserSerializer(serializers.ModelSerializer):
             "is_subscribed",
             "password",
         )
+        list_serializer_class = ViewerListSerializer
 
     def create(self, validated_data):
         user = super().create(validated_data)
@@ -32,12 +34,11 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+    def load_viewer(self, viewer, users):
+        viewer.load_authors(user.pk for user in users)
+
     def get_is_subscribed(self, obj):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            user = request.user
-            return Follow.objects.filter(user=user, following=obj).exists()
-        return False
+        return get_viewer(self.context).is_subscribed(obj.pk)
 
 
 class SetPasswordSerializer(serializers.Serializer):
@@ -112,7 +113,7 @@ class CustomAuthTokenSerializer(serializers.Serializer):
 
 class FollowSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(UserSerializer.Meta):
         fields = (
@@ -126,10 +127,13 @@ class FollowSerializer(UserSerializer):
             "recipes_count",
         )
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
+        preview = self.context.get("recipes")
+        if preview is not None:
+            return recipe_serializers.RecipeInlineSerializer(
+                preview.get(obj.id, []),
+                many=True,
+            ).data
         recipes_limit = self.context.get("recipes_limit")
         recipes = obj.recipes.all()
         if recipes_limit:
@@ -1,5 +1,9 @@
-from core.pagination import LimitPagination
+from core.pagination import HybridPagination
+from django.conf import settings
 from django.contrib.auth.hashers import check_password
+from django_filters.rest_framework import DjangoFilterBackend
+from recipes.api.viewer import ViewerState
+from recipes.models import Recipe
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
@@ -8,6 +12,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
+from users.api.filterset import UserFilter
 from users.api.serializers import (
     CustomAuthTokenSerializer,
     FollowCreateSerializer,
@@ -15,12 +20,22 @@ from users.api.serializers import (
     SetPasswordSerializer,
     UserSerializer,
 )
+from users.authentication import make_signed_token, revoke_signed_tokens
 from users.models import Follow, User
 
 
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
+    pagination_class = HybridPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = UserFilter
+
+    def paginate_queryset(self, queryset):
+        # Пачка по id__in отдаётся целиком одной страницей.
+        if self.request.query_params.get("id__in"):
+            return None
+        return super().paginate_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == "subscribe":
@@ -38,7 +53,10 @@ class UserViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def me(self, request):
-        serializer = self.get_serializer_class()(request.user)
+        serializer = self.get_serializer_class()(
+            request.user,
+            context=self.get_serializer_context(),
+        )
         return Response(serializer.data)
 
     @action(
@@ -56,6 +74,7 @@ class UserViewSet(ModelViewSet):
             ):
                 user.set_password(request.data["new_password"])
                 user.save()
+                revoke_signed_tokens(user)
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(
                 {"detail": "неверный пароль"},
@@ -68,12 +87,12 @@ class UserViewSet(ModelViewSet):
         methods=["GET"],
         url_path="subscriptions",
         permission_classes=(IsAuthenticated,),
-        pagination_class=LimitPagination,
+        pagination_class=HybridPagination,
     )
     def subscriptions(self, request):
         users = User.objects.filter(
             id__in=(
-                Follow.objects.filter(user=request.user).values_list(
+                Follow.objects.filter(user_id=request.user.pk).values_list(
                     "following",
                     flat=True,
                 )
@@ -82,16 +101,43 @@ class UserViewSet(ModelViewSet):
         users = self.filter_queryset(users)
         page = self.paginate_queryset(users)
         serializer = self.get_serializer_class()
+        authors = list(users if page is None else page)
+        viewer = ViewerState(request.user)
+        viewer.mark_followed(author.pk for author in authors)
         context = {
-            "recipes_limit": request.GET.get("recipes_limit"),
+            "recipes": self.get_recipes_preview(
+                authors,
+                request.GET.get("recipes_limit"),
+            ),
             "request": request,
+            "viewer": viewer,
         }
         if page is not None:
             serializer = serializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
-        serializer = serializer(users, many=True, context=context)
+        serializer = serializer(authors, many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def get_recipes_preview(authors, recipes_limit):
+        """Рецепты для FollowSerializer всех авторов страницы."""
+        try:
+            recipes_limit = max(int(recipes_limit), 0)
+        except (TypeError, ValueError):
+            recipes_limit = None
+        preview = {author.id: [] for author in authors}
+        recipes = Recipe.objects.only(
+            "id",
+            "author_id",
+            "name",
+            "image",
+            "image_variants",
+            "cooking_time",
+        ).latest_per_author(list(preview), recipes_limit)
+        for recipe in recipes:
+            preview[recipe.author_id].append(recipe)
+        return preview
+
     @action(
         detail=True,
         methods=["POST", "DELETE"],
@@ -109,7 +155,7 @@ class UserViewSet(ModelViewSet):
                 serializer.save()
                 user = User.objects.get(pk=pk)
                 return Response(
-                    FollowSerializer(user).data,
+                    FollowSerializer(user, context={"request": request}).data,
                     status=status.HTTP_201_CREATED,
                 )
             return Response(
@@ -131,9 +177,12 @@ class CustomAuthToken(ObtainAuthToken):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
-        token, created = Token.objects.get_or_create(user=user)
+        if settings.SIGNED_AUTH_TOKENS:
+            key = make_signed_token(user)
+        else:
+            key = Token.objects.get_or_create(user=user)[0].key
         return Response(
-            {"auth_token": token.key},
+            {"auth_token": key},
             status=status.HTTP_201_CREATED,
         )
 
@@ -143,7 +192,6 @@ class Logout(APIView):
 
     def post(self, request, format=None):
         """Remove all auth tokens owned by request.user."""
-        tokens = Token.objects.filter(user=request.user)
-        for token in tokens:
-            token.delete()
+        Token.objects.filter(user=request.user).delete()
+        revoke_signed_tokens(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
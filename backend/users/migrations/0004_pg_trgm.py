@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_extension(apps, schema_editor):
+    # CREATE EXTENSION требует прав суперпользователя (или владельца базы
+    # в PostgreSQL 13+, где pg_trgm помечено как trusted). Если у роли
+    # приложения таких прав нет, расширение заранее создаёт
+    # администратор: CREATE EXTENSION pg_trgm; — тогда здесь ничего не
+    # выполняется.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_token_generation'),
+    ]
+
+    operations = [
+        # Расширение не удаляется при откате: им могут пользоваться
+        # другие приложения в той же базе.
+        migrations.RunPython(create_extension, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+FIELDS = ("username", "first_name", "last_name")
+
+CREATE_INDEX = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_user_{field}_trgm
+    ON users_user USING gin (UPPER({field}::text) gin_trgm_ops)
+"""
+
+DROP_INDEX = "DROP INDEX CONCURRENTLY IF EXISTS users_user_{field}_trgm"
+
+IS_INVALID = """
+SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+WHERE pg_class.relname = %s AND NOT pg_index.indisvalid
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    # Выражение индекса совпадает с тем, что Django строит для
+    # icontains и istartswith: UPPER("поле"::text) LIKE UPPER(%s).
+    # CONCURRENTLY не блокирует запись в users_user на время построения.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in FIELDS:
+        # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный
+        # индекс, который IF NOT EXISTS пропустил бы: он пересоздаётся.
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(IS_INVALID, [f"users_user_{field}_trgm"])
+            invalid = cursor.fetchone() is not None
+        if invalid:
+            schema_editor.execute(DROP_INDEX.format(field=field))
+        schema_editor.execute(CREATE_INDEX.format(field=field))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for field in FIELDS:
+            schema_editor.execute(DROP_INDEX.format(field=field))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('users', '0004_pg_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,7 +1,9 @@
+from core.models import PreserveDenormalizedMixin
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, IntegerField, Q, Value, When
 
 
 def username_not_me(username):
@@ -9,7 +11,40 @@ def username_not_me(username):
         raise ValidationError('username не может быть "me"')
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def search(self, value):
+        """Поиск по username, имени и фамилии; совпадения с начала выше."""
+        # На PostgreSQL icontains обслуживают триграммные индексы из
+        # миграции 0005_user_search_indexes.
+        words = value.split()
+        if not words:
+            return self
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(username__icontains=word)
+                | Q(first_name__icontains=word)
+                | Q(last_name__icontains=word)
+            )
+        return (
+            self.filter(condition)
+            .annotate(
+                rank=Case(
+                    When(username__istartswith=words[0], then=Value(2)),
+                    When(
+                        Q(first_name__istartswith=words[0])
+                        | Q(last_name__istartswith=words[0]),
+                        then=Value(1),
+                    ),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+            )
+            .order_by("-rank", "-id")
+        )
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, email, password, first_name="", last_name=""):
         """Создает и возвращает пользователя с email и именем."""
         if email is None:
@@ -36,7 +71,7 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractUser):
+class User(PreserveDenormalizedMixin, AbstractUser):
     """Пользовательская модель юзера."""
 
     username_validator = UnicodeUsernameValidator()
@@ -58,6 +93,21 @@ class User(AbstractUser):
         unique=True,
         max_length=254,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Рецептов",
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Подписчиков",
+        default=0,
+        editable=False,
+    )
+    token_generation = models.PositiveIntegerField(
+        verbose_name="Поколение токенов",
+        default=0,
+        editable=False,
+    )
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
@@ -0,0 +1,30 @@
+from core.counters import change_counter
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.authentication import forget_token_state
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.following_id),
+            "followers_count",
+            1,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.following_id),
+        "followers_count",
+        -1,
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_token_state(instance.pk)
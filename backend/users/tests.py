@@ -0,0 +1,133 @@
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(SIGNED_AUTH_TOKENS=True)
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("user@x.ru", "old-password")
+        self.user.username = "user"
+        self.user.save()
+
+    def login(self, password="old-password"):
+        response = APIClient().post(
+            "/api/auth/token/login/",
+            {"email": "user@x.ru", "password": password},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Token {response.data['auth_token']}",
+        )
+        return client
+
+    def assert_status(self, client, status_code):
+        response = client.get("/api/users/me/")
+        self.assertEqual(response.status_code, status_code)
+
+    def test_logout_revokes_all_tokens(self):
+        first, second = self.login(), self.login()
+        self.assert_status(first, 200)
+        self.assert_status(second, 200)
+        response = first.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assert_status(first, 401)
+        self.assert_status(second, 401)
+        self.assert_status(self.login(), 200)
+
+    def test_password_change_revokes_tokens(self):
+        client = self.login()
+        response = client.post(
+            "/api/users/set_password/",
+            {
+                "current_password": "old-password",
+                "new_password": "new-password-42",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_status(client, 401)
+        self.assert_status(self.login("new-password-42"), 200)
+
+    def test_password_hash_upgrade_keeps_tokens(self):
+        client = self.login()
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password("old-password", hasher="pbkdf2_sha1"),
+        )
+        self.login()
+        self.assertTrue(
+            User.objects.get(pk=self.user.pk).password.startswith(
+                "pbkdf2_sha256$",
+            ),
+        )
+        self.assert_status(client, 200)
+
+    def test_warm_cache_authenticates_without_queries(self):
+        client = self.login()
+        self.assert_status(client, 200)
+        # Остаётся только подсчёт подписок: пользователь из базы не читается.
+        with self.assertNumQueries(1):
+            response = client.get("/api/users/subscriptions/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        client = self.login()
+        self.assert_status(client, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assert_status(client, 401)
+
+    def test_tampered_token_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.user.pk}.0:bad")
+        self.assert_status(client, 401)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create(username="viewer", email="viewer@x.ru"),
+        )
+        self.by_username = User.objects.create(
+            username="ivan",
+            email="ivan@x.ru",
+        )
+        self.by_name = User.objects.create(
+            username="petr",
+            email="petr@x.ru",
+            first_name="ivan",
+        )
+        self.inside = User.objects.create(
+            username="alivanov",
+            email="alivanov@x.ru",
+        )
+
+    def test_search_keeps_rank_order_in_cursor_mode(self):
+        expected = [self.by_username.pk, self.by_name.pk, self.inside.pk]
+        for url in (
+            "/api/users/?search=ivan",
+            "/api/users/?search=ivan&cursor=",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [user["id"] for user in response.data["results"]],
+                expected,
+            )
+            self.assertEqual(response.data["count"], 3)
+
+    def test_cursor_mode_without_search_orders_by_id(self):
+        response = self.client.get("/api/users/?cursor=&limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]],
+            [self.inside.pk, self.by_name.pk],
+        )